@@ -0,0 +1,116 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from time import perf_counter, sleep
+
+IMPORT_PATH = os.path.join(os.path.dirname(__file__), os.pardir)
+sys.path.append(IMPORT_PATH)
+
+from src import zygote
+
+DEFAULT_MODULES = ["asyncio", "decimal", "email.mime.multipart", "http.client", "json", "sqlite3"]
+
+
+def create_script(folder: str,
+                  modules: list):
+    """
+    Write a script that imports the modules and prints a line
+
+    Parameters:
+        - folder: Folder where the script is written
+        - modules: Modules the script imports before printing
+    """
+    script_path = os.path.join(folder, "bench_script.py")
+
+    with open(script_path, "w") as f:
+        for module in modules:
+            f.write(f"import {module}\n")
+        f.write("print('ready')\n")
+
+    return script_path
+
+
+def wait_first_line(log_path: str,
+                    start: float):
+    """
+    Wait until the log has a full line and return the elapsed seconds
+
+    Parameters:
+        - log_path: Log written by the script
+        - start: perf_counter value when the launch started
+    """
+    while True:
+        try:
+            with open(log_path, "r") as f:
+                if f.readline().endswith("\n"):
+                    return perf_counter() - start
+        except FileNotFoundError:
+            pass
+        sleep(0.0005)
+
+
+def run_popen(folder: str,
+              script_path: str,
+              log_path: str):
+    start = perf_counter()
+
+    with open(log_path, "w") as log_file:
+        subprocess.Popen([sys.executable, "-u", script_path],
+                         stdout=log_file,
+                         stderr=log_file,
+                         start_new_session=True,
+                         cwd=folder)
+
+    return wait_first_line(log_path, start)
+
+
+def run_zygote(script_zygote: zygote.Zygote,
+               folder: str,
+               script_path: str,
+               log_path: str):
+    start = perf_counter()
+
+    script_zygote.launch(script_path, folder, [], log_path)
+
+    return wait_first_line(log_path, start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first line, Popen vs zygote")
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    parser.add_argument("-m", "--modules", nargs="*", default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    if not zygote.is_supported():
+        raise SystemExit("Zygotes Are Not Supported On This Platform")
+
+    with tempfile.TemporaryDirectory() as folder:
+        script_path = create_script(folder, args.modules)
+        script_zygote = zygote.Zygote(sys.executable, args.modules, folder)
+        script_zygote.ensure_running()
+
+        results = {"popen": [], "zygote": []}
+
+        try:
+            for i in range(args.runs):
+                log_path = os.path.join(folder, f"popen_{i}.txt")
+                results["popen"].append(run_popen(folder, script_path, log_path))
+
+                log_path = os.path.join(folder, f"zygote_{i}.txt")
+                results["zygote"].append(run_zygote(script_zygote, folder, script_path, log_path))
+        finally:
+            script_zygote.stop()
+
+    print(f"Modules: {', '.join(args.modules)} | Runs: {args.runs}")
+    for name, times in results.items():
+        median = statistics.median(times) * 1000
+        best = min(times) * 1000
+        print(f"{name:>7}: median {median:7.2f} ms | best {best:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
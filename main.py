@@ -1,5 +1,8 @@
 from src.script_handler import ScriptHandler
+from src.log_aggregator import LogAggregator, BLOCK_POLICY, DROP_POLICY
+from src.sharding import ShardCoordinator, LEASE_PERIOD
 
+import argparse
 import traceback
 import os
 
@@ -7,12 +10,50 @@ THIS_FOLDER = os.path.dirname(__file__)
 LOG_FILE = os.path.join(THIS_FOLDER, "log.txt")
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Check the scripts and restart the dead ones")
+    parser.add_argument("--watch", type=float, default=None,
+                        help="Keep checking every WATCH seconds instead of checking once")
+    parser.add_argument("--policy", choices=[BLOCK_POLICY, DROP_POLICY], default=BLOCK_POLICY,
+                        help="What to do with captured output when a script floods it")
+    parser.add_argument("--shard-dir", default=None,
+                        help="Lease folder shared with other supervisors on this host, to split the scripts with them")
+    parser.add_argument("--supervisor-id", default=None,
+                        help="Unique id of this supervisor, host and pid by default")
+    parser.add_argument("--lease-period", type=float, default=LEASE_PERIOD,
+                        help="Seconds until the scripts of a dead supervisor move to the others")
+    arguments = parser.parse_args()
+
+    if arguments.shard_dir is not None and arguments.watch is None:
+        parser.error("--shard-dir needs --watch")
+
+    return arguments
+
+
 if __name__ == "__main__":
+    arguments = parse_arguments()
+    aggregator = None
+    coordinator = None
     try:
         scripts_file = os.path.join(THIS_FOLDER, "scripts.json")
-        handler = ScriptHandler(scripts_file)
-        handler.check_scripts()
+
+        if arguments.watch is None:
+            handler = ScriptHandler(scripts_file)
+            handler.check_scripts()
+        else:
+            aggregator = LogAggregator(policy=arguments.policy)
+            if arguments.shard_dir is not None:
+                coordinator = ShardCoordinator(arguments.shard_dir,
+                                               arguments.supervisor_id,
+                                               arguments.lease_period)
+            handler = ScriptHandler(scripts_file, aggregator, coordinator=coordinator)
+            handler.watch(arguments.watch)
     except:
         error = traceback.format_exc()
         with open(LOG_FILE, "w") as f:
-            f.write(error)
\ No newline at end of file
+            f.write(error)
+    finally:
+        if coordinator is not None:
+            coordinator.leave()
+        if aggregator is not None:
+            aggregator.close()
@@ -11,4 +11,14 @@ ARG_FIELD = "arguments"
 TIMEOUT_FIELD = "timeout"
 LAST_DATE_FIELD = "last_date"
 
-ACTIVE_FIELD = "active"
\ No newline at end of file
+ACTIVE_FIELD = "active"
+
+ZYGOTE_FIELD = "zygote"
+PRELOAD_FIELD = "preload"
+CAPTURE_FIELD = "capture"
+RESTART_FIELD = "restart_requested"
+
+TAGS_FIELD = "tags"
+GROUP_FIELD = "group"
+PROBE_FIELD = "probe"
+LOCK_SUFFIX = ".lock"
@@ -21,4 +21,19 @@ class InvalidSavePath(OSError):
 
 class ProcessException(OSError):
     def __init__(self, *args: object) -> None:
-        super().__init__(*args)
\ No newline at end of file
+        super().__init__(*args)
+
+
+class ZygoteException(ProcessException):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class ShardException(OSError):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
+class RollingRestartFailed(ProcessException):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
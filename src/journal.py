@@ -0,0 +1,557 @@
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import zlib
+
+from time import time
+
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .utils import file_lock
+
+# timestamp, script id, pid, event, reason, padding, exit status
+RECORD = struct.Struct("<dIIBBxxi")
+
+EVENT_START = 1
+EVENT_EXIT = 2
+EVENT_KILL = 3
+EVENT_STOP = 4
+EVENT_NAMES = {EVENT_START: "start", EVENT_EXIT: "exit", EVENT_KILL: "kill", EVENT_STOP: "stop"}
+END_EVENTS = (EVENT_EXIT, EVENT_KILL, EVENT_STOP)
+
+REASON_FIRST = 0
+REASON_EXITED = 1
+REASON_TIMEOUT = 2
+REASON_MANUAL = 3
+REASON_NAMES = {REASON_FIRST: "first", REASON_EXITED: "exited", REASON_TIMEOUT: "timeout", REASON_MANUAL: "manual"}
+
+NO_STATUS = -1
+NO_PID = 0
+
+SEGMENT_RECORDS = 65536
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".bin"
+STATE_SUFFIX = ".state"
+JOURNAL_FOLDER_NAME = "journal"
+LOCK_FILE_NAME = ".lock"
+
+
+class JournalRecord(NamedTuple):
+    timestamp: float
+    script_id: int
+    pid: int
+    event: int
+    reason: int
+    exit_status: int
+
+
+def script_id(name: str):
+    """
+    Returns the id stored in the journal for a script name
+
+    Parameters:
+        - name: Name of the script
+    """
+    return zlib.crc32(name.encode("utf-8"))
+
+
+def default_journal_folder(scripts_file: str):
+    """
+    Returns the journal folder used next to a scripts file
+
+    Parameters:
+        - scripts_file: Path where the scripts are saved
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(scripts_file)), JOURNAL_FOLDER_NAME)
+
+
+class Segment():
+    def __init__(self,
+                 path: str) -> None:
+        self.path = path
+        self.records = 0
+        self.file = None
+        self.map = None
+
+    def __enter__(self):
+        size = os.path.getsize(self.path)
+        self.records = size // RECORD.size
+
+        if self.records > 0:
+            self.file = open(self.path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self
+
+    def __exit__(self, *args):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+
+    def timestamp(self,
+                  index: int):
+        return struct.unpack_from("<d", self.map, index * RECORD.size)[0]
+
+    def record(self,
+               index: int):
+        return JournalRecord(*RECORD.unpack_from(self.map, index * RECORD.size))
+
+    def bisect(self,
+               timestamp: float):
+        """
+        Returns the index of the first record at or after timestamp
+
+        Parameters:
+            - timestamp: Epoch seconds to look for
+        """
+        low = 0
+        high = self.records
+
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+
+class RunJournal():
+    def __init__(self,
+                 folder: str,
+                 segment_records: int = SEGMENT_RECORDS) -> None:
+        if segment_records <= 0:
+            raise ValueError(f"Segment Records Must Be A Positive Integer [{segment_records}]")
+
+        os.makedirs(folder, exist_ok=True)
+
+        self.folder = folder
+        self.lock_path = os.path.join(folder, LOCK_FILE_NAME)
+        self.segment_records = segment_records
+
+    def segments(self):
+        """
+        Returns the (first timestamp, path) of every segment, oldest first
+        """
+        return [(start_us / 1e6, path) for start_us, path in self.segments_us()]
+
+    def segments_us(self):
+        """
+        Returns the (first timestamp in microseconds, path) of every
+        segment, oldest first, as written in their names
+        """
+        segments = []
+
+        for filename in os.listdir(self.folder):
+            if not filename.startswith(SEGMENT_PREFIX) or not filename.endswith(SEGMENT_SUFFIX):
+                continue
+
+            start = filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            if not start.isdigit():
+                continue
+
+            segments.append((int(start), os.path.join(self.folder, filename)))
+
+        segments.sort()
+
+        return segments
+
+    def segment_path(self,
+                     start_us: int):
+        filename = f"{SEGMENT_PREFIX}{start_us:020d}{SEGMENT_SUFFIX}"
+        return os.path.join(self.folder, filename)
+
+    def state_path(self,
+                   segment_path: str):
+        return segment_path[:-len(SEGMENT_SUFFIX)] + STATE_SUFFIX
+
+    def read_state(self,
+                   segment_path: str) -> Optional[Dict[int, JournalRecord]]:
+        """
+        Returns the last record of every script before the segment
+        starts, by script id, or None if the segment has no state
+
+        Parameters:
+            - segment_path: Path of the segment
+        """
+        try:
+            with open(self.state_path(segment_path), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        data = data[:len(data) - len(data) % RECORD.size]
+        state = {}
+
+        for values in RECORD.iter_unpack(data):
+            record = JournalRecord(*values)
+            state[record.script_id] = record
+
+        return state
+
+    def write_state(self,
+                    full_path: str,
+                    new_path: str):
+        """
+        Save the last record of every script at the start of a new
+        segment, so queries don't need to walk back the older ones.
+        The journal lock must be held.
+
+        Parameters:
+            - full_path: Path of the segment that is full
+            - new_path: Path of the segment about to be started
+        """
+        state = self.read_state(full_path)
+        if state is None:
+            state = {}
+
+        with Segment(full_path) as segment:
+            for i in range(segment.records):
+                record = segment.record(i)
+                state[record.script_id] = record
+
+        state_path = self.state_path(new_path)
+        temp_path = state_path + ".tmp"
+
+        with open(temp_path, "wb") as f:
+            for record in state.values():
+                f.write(RECORD.pack(*record))
+
+        os.replace(temp_path, state_path)
+
+    def append(self,
+               name: str,
+               event: int,
+               pid: Optional[int] = None,
+               reason: int = REASON_FIRST,
+               exit_status: Optional[int] = None,
+               timestamp: Optional[float] = None):
+        """
+        Append an event of a script to the journal
+
+        Parameters:
+            - name: Name of the script
+            - event: One of the EVENT constants
+            - pid: Process the event is about
+            - reason: One of the REASON constants, for start events
+            - exit_status: Exit status of the process, if known
+            - timestamp: Epoch seconds of the event, now by default
+        """
+        if event not in EVENT_NAMES:
+            raise ValueError(f"Invalid Journal Event [{event}]")
+
+        if timestamp is None:
+            timestamp = time()
+
+        if pid is None:
+            pid = NO_PID
+
+        if exit_status is None:
+            exit_status = NO_STATUS
+
+        # Several supervisors may append to the same journal
+        with file_lock(self.lock_path):
+            segments = self.segments_us()
+            path = None
+
+            if segments:
+                start_us, path = segments[-1]
+                size = os.path.getsize(path)
+                records = size // RECORD.size
+
+                if size % RECORD.size:
+                    # Drop a record cut by a crash, so the next ones stay aligned
+                    with open(path, "r+b") as f:
+                        f.truncate(records * RECORD.size)
+
+                if records > 0:
+                    # Keep the journal sorted even if clocks go backwards
+                    with open(path, "rb") as f:
+                        f.seek((records - 1) * RECORD.size)
+                        last_timestamp = struct.unpack("<d", f.read(8))[0]
+                    timestamp = max(timestamp, last_timestamp)
+
+                if records >= self.segment_records:
+                    # The new segment name must sort after the full one. Compare
+                    # in whole microseconds, as floats this large lose the last digit
+                    next_us = max(int(timestamp * 1e6), start_us + 1)
+                    timestamp = max(timestamp, next_us / 1e6)
+                    full_path = path
+                    path = self.segment_path(next_us)
+                    self.write_state(full_path, path)
+
+            if path is None:
+                start_us = int(timestamp * 1e6)
+                timestamp = max(timestamp, start_us / 1e6)
+                path = self.segment_path(start_us)
+
+            record = RECORD.pack(timestamp, script_id(name), pid, event, reason, exit_status)
+
+            with open(path, "ab") as f:
+                f.write(record)
+
+    def segments_between(self,
+                         since: Optional[float] = None,
+                         until: Optional[float] = None):
+        """
+        Returns the segment paths that may hold records in the range
+
+        Parameters:
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        segments = self.segments()
+        selected = []
+
+        for i, (start, path) in enumerate(segments):
+            if until is not None and start > until:
+                break
+
+            if since is not None and i + 1 < len(segments) and segments[i + 1][0] < since:
+                continue
+
+            selected.append(path)
+
+        return selected
+
+    def events(self,
+               name: Optional[str] = None,
+               since: Optional[float] = None,
+               until: Optional[float] = None) -> Iterator[JournalRecord]:
+        """
+        Iterate the records of the range, oldest first
+
+        Parameters:
+            - name: Only return records of this script
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        wanted_id = None if name is None else script_id(name)
+
+        for path in self.segments_between(since, until):
+            with Segment(path) as segment:
+                first = 0 if since is None else segment.bisect(since)
+
+                for i in range(first, segment.records):
+                    record = segment.record(i)
+
+                    if until is not None and record.timestamp > until:
+                        return
+
+                    if wanted_id is None or record.script_id == wanted_id:
+                        yield record
+
+    def last_events(self,
+                    name: str,
+                    count: int,
+                    before: Optional[float] = None) -> List[JournalRecord]:
+        """
+        Returns the last count records of a script, oldest first
+
+        Parameters:
+            - name: Name of the script
+            - count: Number of records to return
+            - before: Only look at records older than this epoch seconds
+        """
+        wanted_id = script_id(name)
+        found = []
+
+        for path in reversed(self.segments_between(None, before)):
+            with Segment(path) as segment:
+                last = segment.records if before is None else segment.bisect(before)
+
+                for i in range(last - 1, -1, -1):
+                    record = segment.record(i)
+
+                    if record.script_id == wanted_id:
+                        found.append(record)
+
+                        if len(found) >= count:
+                            return found[::-1]
+
+            # Older segments can't have records of a script missing from the state
+            state = self.read_state(path)
+            if state is not None and wanted_id not in state:
+                break
+
+        return found[::-1]
+
+    def last_event(self,
+                   name: str,
+                   before: float) -> Optional[JournalRecord]:
+        """
+        Returns the last record of a script older than a timestamp,
+        only reading the segment holding it and its state
+
+        Parameters:
+            - name: Name of the script
+            - before: Epoch seconds to look before
+        """
+        wanted_id = script_id(name)
+
+        for path in reversed(self.segments_between(None, before)):
+            with Segment(path) as segment:
+                for i in range(segment.bisect(before) - 1, -1, -1):
+                    record = segment.record(i)
+
+                    if record.script_id == wanted_id:
+                        return record
+
+            state = self.read_state(path)
+            if state is not None:
+                return state.get(wanted_id, None)
+
+        return None
+
+    def restart_count(self,
+                      name: str,
+                      since: Optional[float] = None,
+                      until: Optional[float] = None):
+        """
+        Returns how many times a script was started again in the range,
+        either because it exited, timed out or was restarted by hand
+
+        Parameters:
+            - name: Name of the script
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        restarts = 0
+
+        for record in self.events(name, since, until):
+            if record.event == EVENT_START and record.reason != REASON_FIRST:
+                restarts += 1
+
+        return restarts
+
+    def run_summary(self,
+                    name: str,
+                    since: float,
+                    until: Optional[float] = None) -> Tuple[float, int]:
+        """
+        Returns the seconds the script was running in the range
+        and how many times it exited on its own
+
+        Parameters:
+            - name: Name of the script
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        if until is None:
+            until = time()
+
+        previous = self.last_event(name, since)
+        running = previous is not None and previous.event == EVENT_START
+        running_since = since
+
+        uptime = 0.0
+        exits = 0
+
+        for record in self.events(name, since, until):
+            if record.event == EVENT_START and not running:
+                running = True
+                running_since = record.timestamp
+            elif record.event in END_EVENTS and running:
+                running = False
+                uptime += record.timestamp - running_since
+
+            if record.event == EVENT_EXIT:
+                exits += 1
+
+        if running:
+            uptime += until - running_since
+
+        return uptime, exits
+
+    def uptime(self,
+               name: str,
+               since: float,
+               until: Optional[float] = None):
+        """
+        Returns the percentage of the range the script was running
+
+        Parameters:
+            - name: Name of the script
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        if until is None:
+            until = time()
+
+        if until <= since:
+            raise ValueError(f"Range Must End After It Starts [{since}, {until}]")
+
+        uptime, _ = self.run_summary(name, since, until)
+
+        return 100 * uptime / (until - since)
+
+    def mtbf(self,
+             name: str,
+             since: float,
+             until: Optional[float] = None):
+        """
+        Returns the mean running seconds between exits of the script
+        in the range, or None if it never exited
+
+        Parameters:
+            - name: Name of the script
+            - since: Epoch seconds where the range starts
+            - until: Epoch seconds where the range ends
+        """
+        uptime, exits = self.run_summary(name, since, until)
+
+        if exits == 0:
+            return None
+
+        return uptime / exits
+
+
+def format_record(record: JournalRecord):
+    date = datetime.datetime.fromtimestamp(record.timestamp).isoformat()
+    text = f"{date} {EVENT_NAMES.get(record.event, record.event)} pid={record.pid}"
+
+    if record.event == EVENT_START:
+        text += f" reason={REASON_NAMES.get(record.reason, record.reason)}"
+
+    if record.exit_status != NO_STATUS:
+        text += f" status={record.exit_status}"
+
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the scripts run journal")
+    parser.add_argument("folder", help="Journal folder")
+    parser.add_argument("command", choices=["stats", "events"])
+    parser.add_argument("name", help="Name of the script")
+    parser.add_argument("--days", type=float, default=7, help="Range of the stats, in days")
+    parser.add_argument("-n", "--count", type=int, default=20, help="Number of events to show")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        raise SystemExit(f"Journal Folder Doesn't Exist [{args.folder}]")
+
+    journal = RunJournal(args.folder)
+
+    if args.command == "events":
+        for record in journal.last_events(args.name, args.count):
+            print(format_record(record))
+        return
+
+    until = time()
+    since = until - args.days * 86400
+
+    mtbf = journal.mtbf(args.name, since, until)
+    mtbf_text = "-" if mtbf is None else f"{mtbf:.0f}s"
+
+    print(f"{args.name} | last {args.days:g} days")
+    print(f"Uptime: {journal.uptime(args.name, since, until):.2f}%")
+    print(f"Restarts: {journal.restart_count(args.name, since, until)}")
+    print(f"MTBF: {mtbf_text}")
+
+
+if __name__ == "__main__":
+    main()
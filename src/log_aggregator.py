@@ -0,0 +1,312 @@
+import asyncio
+import collections
+import datetime
+import functools
+import os
+import threading
+
+from typing import BinaryIO, Dict, List, Optional
+
+BLOCK_POLICY = "block"
+DROP_POLICY = "drop"
+POLICIES = (BLOCK_POLICY, DROP_POLICY)
+
+STDOUT_STREAM = "stdout"
+STDERR_STREAM = "stderr"
+
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+RECENT_LINES = 200
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.25
+LINE_LIMIT = 64 * 1024
+CLOSE_TIMEOUT = 5
+
+
+class RotatingLog():
+    def __init__(self,
+                 path: str,
+                 max_bytes: int = MAX_LOG_BYTES,
+                 backups: int = LOG_BACKUPS) -> None:
+        if max_bytes <= 0:
+            raise ValueError(f"Max Bytes Must Be A Positive Integer [{max_bytes}]")
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = None
+
+    def rotate(self):
+        """
+        Shift the backups one place and start an empty log
+        """
+        self.close()
+
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self,
+              text: str):
+        """
+        Append the text, rotating first if the log is full
+
+        Parameters:
+            - text: Text to append
+        """
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+
+        if self.file.tell() > 0 and self.file.tell() + len(text) > self.max_bytes:
+            self.rotate()
+            self.file = open(self.path, "a", encoding="utf-8")
+
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ScriptLog():
+    def __init__(self,
+                 name: str,
+                 log: RotatingLog,
+                 queue_size: int,
+                 recent_lines: int) -> None:
+        self.name = name
+        self.log = log
+        self.queue = asyncio.Queue(queue_size)
+        self.recent = collections.deque(maxlen=recent_lines)
+        self.dropped = 0
+        self.unreported_drops = 0
+        self.writer: Optional[asyncio.Task] = None
+        self.readers: List[asyncio.Task] = []
+        self.transports: List[asyncio.ReadTransport] = []
+
+
+class LogAggregator():
+    def __init__(self,
+                 max_bytes: int = MAX_LOG_BYTES,
+                 backups: int = LOG_BACKUPS,
+                 recent_lines: int = RECENT_LINES,
+                 queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 policy: str = BLOCK_POLICY) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Policy Must Be One Of {POLICIES} [{policy}]")
+
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.recent_lines = recent_lines
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+
+        self.scripts: Dict[str, ScriptLog] = {}
+        self.lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       name="log-aggregator",
+                                       daemon=True)
+        self.thread.start()
+
+    def attach(self,
+               name: str,
+               log_path: str,
+               stdout: BinaryIO,
+               stderr: BinaryIO):
+        """
+        Start reading the output pipes of a script process.
+        Lines of every run of the same script go to the same log.
+
+        Parameters:
+            - name: Name of the script
+            - log_path: Rotating log of the script
+            - stdout: Readable end of the script stdout pipe
+            - stderr: Readable end of the script stderr pipe
+        """
+        future = asyncio.run_coroutine_threadsafe(self._attach(name, log_path, stdout, stderr),
+                                                  self.loop)
+        future.result()
+
+    def recent(self,
+               name: str):
+        """
+        Returns the last captured lines of the given script
+
+        Parameters:
+            - name: Name of the script
+        """
+        script_log = self.scripts.get(name, None)
+        if script_log is None:
+            return []
+
+        with self.lock:
+            return list(script_log.recent)
+
+    def dropped(self,
+                name: str):
+        """
+        Returns how many lines of the given script were dropped
+
+        Parameters:
+            - name: Name of the script
+        """
+        script_log = self.scripts.get(name, None)
+        if script_log is None:
+            return 0
+
+        return script_log.dropped
+
+    def flush(self,
+              timeout: Optional[float] = None):
+        """
+        Wait until every queued line has been written
+
+        Parameters:
+            - timeout: Maximum seconds to wait
+        """
+        future = asyncio.run_coroutine_threadsafe(self._flush(), self.loop)
+        future.result(timeout)
+
+    def close(self):
+        """
+        Read what the scripts already wrote, write the pending
+        lines, close the logs and stop the loop
+        """
+        if not self.loop.is_running():
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._close(), self.loop)
+        future.result()
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def _attach(self,
+                      name: str,
+                      log_path: str,
+                      stdout: BinaryIO,
+                      stderr: BinaryIO):
+        script_log = self.scripts.get(name, None)
+
+        if script_log is None:
+            log = RotatingLog(log_path, self.max_bytes, self.backups)
+            script_log = ScriptLog(name, log, self.queue_size, self.recent_lines)
+            script_log.writer = asyncio.create_task(self._write_lines(script_log))
+            self.scripts[name] = script_log
+
+        for stream, pipe in ((STDOUT_STREAM, stdout), (STDERR_STREAM, stderr)):
+            reader = asyncio.StreamReader(limit=LINE_LIMIT)
+            protocol = asyncio.StreamReaderProtocol(reader)
+            transport, _ = await self.loop.connect_read_pipe(lambda: protocol, pipe)
+            reader_task = asyncio.create_task(self._read_lines(script_log, stream, reader))
+
+            script_log.transports.append(transport)
+            script_log.readers.append(reader_task)
+            reader_task.add_done_callback(functools.partial(self._detach, script_log, transport))
+
+    def _detach(self,
+                script_log: ScriptLog,
+                transport: asyncio.ReadTransport,
+                reader_task: asyncio.Task):
+        script_log.readers.remove(reader_task)
+        script_log.transports.remove(transport)
+        transport.close()
+
+    async def _read_lines(self,
+                          script_log: ScriptLog,
+                          stream: str,
+                          reader: asyncio.StreamReader):
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                line = f"[Line Longer Than {LINE_LIMIT} Bytes Skipped]\n".encode()
+
+            if not line:
+                break
+
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            now = datetime.datetime.now().isoformat()
+            entry = f"{now} [{stream}] [{script_log.name}] {text}\n"
+
+            if self.policy == BLOCK_POLICY:
+                await script_log.queue.put(entry)
+                continue
+
+            try:
+                script_log.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                script_log.dropped += 1
+                script_log.unreported_drops += 1
+
+    async def _write_lines(self,
+                           script_log: ScriptLog):
+        queue = script_log.queue
+
+        while True:
+            batch = [await queue.get()]
+            self._drain(queue, batch)
+
+            if len(batch) < self.batch_size and self.flush_interval > 0:
+                await asyncio.sleep(self.flush_interval)
+                self._drain(queue, batch)
+
+            queued = len(batch)
+
+            if script_log.unreported_drops > 0:
+                now = datetime.datetime.now().isoformat()
+                batch.append(f"{now} [aggregator] [{script_log.name}] Dropped {script_log.unreported_drops} Lines\n")
+                script_log.unreported_drops = 0
+
+            script_log.log.write("".join(batch))
+
+            with self.lock:
+                script_log.recent.extend(entry.rstrip("\n") for entry in batch)
+
+            for _ in range(queued):
+                queue.task_done()
+
+    def _drain(self,
+               queue: asyncio.Queue,
+               batch: List[str]):
+        while len(batch) < self.batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+
+    async def _flush(self):
+        for script_log in list(self.scripts.values()):
+            await script_log.queue.join()
+
+    async def _close(self):
+        readers = [task for script_log in self.scripts.values() for task in script_log.readers]
+        if readers:
+            await asyncio.wait(readers, timeout=CLOSE_TIMEOUT)
+
+        await self._flush()
+
+        for script_log in self.scripts.values():
+            for reader_task in list(script_log.readers):
+                reader_task.cancel()
+            script_log.writer.cancel()
+
+        tasks = [script_log.writer for script_log in self.scripts.values()]
+        tasks += [task for script_log in self.scripts.values() for task in script_log.readers]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for script_log in self.scripts.values():
+            script_log.log.close()
@@ -1,16 +1,37 @@
+import datetime
 import json
 import os
+import shlex
+import subprocess
+
+from time import sleep, monotonic
+
+from typing import Callable, List, Optional
 
 from .script import Script
-from .utils import kill_process
+from .journal import RunJournal, default_journal_folder, EVENT_STOP
+from .utils import file_lock, is_process_alive
 
-from .exceptions import InvalidScriptsFile
-from .constants import NAME_FIELD, ACTIVE_FIELD, PID_FIELD, LAST_DATE_FIELD
+from .exceptions import InvalidScriptsFile, RollingRestartFailed
+from .constants import NAME_FIELD, ACTIVE_FIELD, PID_FIELD, LAST_DATE_FIELD, LOCK_SUFFIX
+from .constants import DIRECTORY_FIELD, TAGS_FIELD, GROUP_FIELD, PROBE_FIELD, CAPTURE_FIELD, RESTART_FIELD
 
 THIS_FOLDER = os.path.dirname(__file__)
 SCRIPTS_FILE_NAME = "scripts.json"
 SCRIPTS_FILE = os.path.join(THIS_FOLDER, os.pardir, SCRIPTS_FILE_NAME)
 
+SETTLE_TIME = 30
+POLL_INTERVAL = 0.5
+PROBE_TIMEOUT = 30
+RESTART_TIMEOUT = 30
+
+RESTARTING_EVENT = "restarting"
+SETTLED_EVENT = "settled"
+SKIPPED_EVENT = "skipped"
+FAILED_EVENT = "failed"
+ABORTED_EVENT = "aborted"
+DONE_EVENT = "done"
+
 
 def read_scripts(scripts_file: str = SCRIPTS_FILE):
     """
@@ -55,44 +76,288 @@ def list_scripts(scripts_file: str = SCRIPTS_FILE):
     return script_list
 
 
+def find_script(scripts: List[dict],
+                name: str):
+    """
+    Given the scripts, it returns the one with the given name
+
+    Parameters:
+        - scripts: Scripts as saved in the scripts file
+        - name: Name of the script
+    """
+    for script in scripts:
+        if script[NAME_FIELD] == name:
+            return script
+
+    raise KeyError(f"Script Name Not Found [{name}]")
+
+
+def write_scripts(scripts: List[dict],
+                  scripts_file: str = SCRIPTS_FILE):
+    """
+    Given the scripts, it saves them. The lock file must be held.
+
+    Parameters:
+        - scripts: Scripts to save
+        - scripts_file: Path where the scripts are saved
+    """
+    with open(scripts_file, "w") as f:
+        f.write(json.dumps(scripts, indent=4))
+
+
+def restart_stored_script(scripts: List[dict],
+                          script: dict,
+                          scripts_file: str = SCRIPTS_FILE):
+    """
+    Given a script, it stops its process, starts it again from here
+    and saves its new pid. The lock file must be held.
+    Returns the restarted Script.
+
+    Parameters:
+        - scripts: Scripts as read from the scripts file
+        - script: The one of the scripts to restart
+        - scripts_file: Path where the scripts are saved
+    """
+    script_item = Script.from_dict(script)
+    script_item.journal = RunJournal(default_journal_folder(scripts_file))
+
+    script_item.restart_process()
+
+    script[PID_FIELD] = script_item.last_pid
+    script[LAST_DATE_FIELD] = script_item.last_time.isoformat()
+
+    write_scripts(scripts, scripts_file)
+
+    return script_item
+
+
 def restart_script(name: str,
-                   scripts_file: str = SCRIPTS_FILE):
+                   scripts_file: str = SCRIPTS_FILE,
+                   request_timeout: float = RESTART_TIMEOUT,
+                   poll_interval: float = POLL_INTERVAL):
     """
     Given a script, it stops its process and restarts it.
+    Scripts with captured output are restarted by the watching
+    supervisor, as their pipes must be read by its aggregator.
+    If none does it in time, the script is restarted from here
+    and its output goes to a log file of this run instead.
+    Returns the pid of the new process.
 
     Parameters:
         - name: Name of the script to stop
         - scripts_file: Path where the scripts are saved
+        - request_timeout: Seconds to wait for the supervisor
+        - poll_interval: Seconds between checks of the request
     """
-    scripts = read_scripts(scripts_file)
+    lock_path = scripts_file + LOCK_SUFFIX
 
-    script_found = False
-    changed_scripts = []
+    with file_lock(lock_path):
+        scripts = read_scripts(scripts_file)
+        script = find_script(scripts, name)
 
-    for i, script in enumerate(scripts):
-        script_name = script[NAME_FIELD]
+        if not script.get(ACTIVE_FIELD, True):
+            raise ValueError("Can't Restart Deactivated Script")
 
-        if script_name == name:
-            script_found = True
-            active_script = script.get(ACTIVE_FIELD, True)
+        if not script.get(CAPTURE_FIELD, False):
+            return restart_stored_script(scripts, script, scripts_file).last_pid
 
-            if not active_script:
-                raise ValueError("Can't Restart Deactivated Script")
+        script[RESTART_FIELD] = True
+        write_scripts(scripts, scripts_file)
 
-            script_item = Script.from_dict(script)
+    deadline = monotonic() + request_timeout
 
-            script_item.restart_process()
+    while monotonic() < deadline:
+        sleep(poll_interval)
 
-            script[PID_FIELD] = script_item.last_pid
-            script[LAST_DATE_FIELD] = script_item.last_time.isoformat()
+        with file_lock(lock_path):
+            script = find_script(read_scripts(scripts_file), name)
 
-        changed_scripts.append(script)
+        if not script.get(RESTART_FIELD, False):
+            return script.get(PID_FIELD, None)
 
-    if not script_found:
-        raise KeyError(f"Script Name Not Found [{name}]")
+    with file_lock(lock_path):
+        scripts = read_scripts(scripts_file)
+        script = find_script(scripts, name)
 
-    with open(scripts_file, "w") as f:
-        f.write(json.dumps(changed_scripts, indent=4))
+        if not script.pop(RESTART_FIELD, False):
+            return script.get(PID_FIELD, None)
+
+        if not script.get(ACTIVE_FIELD, True):
+            write_scripts(scripts, scripts_file)
+            raise ValueError("Can't Restart Deactivated Script")
+
+        script_item = restart_stored_script(scripts, script, scripts_file)
+
+    print(f"No Supervisor Restarted {name} In Time, Its Output Is Not Captured [{script_item.save_path}]")
+
+    return script_item.last_pid
+
+
+def select_scripts(scripts: List[dict],
+                   names: Optional[List[str]] = None,
+                   tag: Optional[str] = None,
+                   group: Optional[str] = None):
+    """
+    Given the scripts, it returns the ones matching any of the
+    given names, tag or group, in the order they are saved
+
+    Parameters:
+        - scripts: Scripts as saved in the scripts file
+        - names: Names of the scripts
+        - tag: Tag the scripts have in their tags list
+        - group: Group the scripts belong to
+    """
+    if names is None and tag is None and group is None:
+        raise ValueError("Must Provide Names, A Tag Or A Group")
+
+    if names is None:
+        names = []
+
+    saved_names = [script[NAME_FIELD] for script in scripts]
+    for name in names:
+        if name not in saved_names:
+            raise KeyError(f"Script Name Not Found [{name}]")
+
+    selected = []
+
+    for script in scripts:
+        in_names = script[NAME_FIELD] in names
+        in_tag = tag is not None and tag in script.get(TAGS_FIELD, [])
+        in_group = group is not None and script.get(GROUP_FIELD, None) == group
+
+        if in_names or in_tag or in_group:
+            selected.append(script)
+
+    return selected
+
+
+def run_probe(script: dict):
+    """
+    Given a script, it runs its probe command in its directory.
+    Returns a bool indicating if the probe passed or there's none.
+
+    Parameters:
+        - script: Script as saved in the scripts file
+    """
+    probe = script.get(PROBE_FIELD, None)
+    if probe is None:
+        return True
+
+    try:
+        result = subprocess.run(shlex.split(probe),
+                                cwd=script.get(DIRECTORY_FIELD, None),
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL,
+                                timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+    return result.returncode == 0
+
+
+def print_progress(event: str,
+                   name: str,
+                   detail: str = ""):
+    print(f"[{datetime.datetime.now()}] {event.capitalize()} {name} {detail}".rstrip())
+
+
+def rolling_restart(names: Optional[List[str]] = None,
+                    tag: Optional[str] = None,
+                    group: Optional[str] = None,
+                    max_in_flight: int = 1,
+                    settle: float = SETTLE_TIME,
+                    scripts_file: str = SCRIPTS_FILE,
+                    progress: Callable[[str, str, str], None] = print_progress,
+                    poll_interval: float = POLL_INTERVAL):
+    """
+    Given a set of scripts, it restarts them a few at a time.
+    Every restarted script must stay alive for the settle time and
+    then pass its probe, if it has one, to free its place for the
+    next one. On a failure no more scripts are restarted and once
+    the ones in flight settle, RollingRestartFailed is raised.
+    Returns the names of the restarted scripts.
+
+    Parameters:
+        - names: Names of the scripts to restart
+        - tag: Restart the scripts with this tag
+        - group: Restart the scripts of this group
+        - max_in_flight: Scripts allowed to be settling at once
+        - settle: Seconds a restarted script must stay alive
+        - scripts_file: Path where the scripts are saved
+        - progress: Called with the event, script name and detail
+        - poll_interval: Seconds between checks of the settling scripts
+    """
+    if max_in_flight < 1:
+        raise ValueError(f"Max In Flight Must Be A Positive Integer [{max_in_flight}]")
+
+    if settle < 0:
+        raise ValueError(f"Settle Time Must Be Positive [{settle}]")
+
+    with file_lock(scripts_file + LOCK_SUFFIX):
+        scripts = read_scripts(scripts_file)
+
+    pending = []
+    for script in select_scripts(scripts, names, tag, group):
+        if script.get(ACTIVE_FIELD, True):
+            pending.append(script)
+        else:
+            progress(SKIPPED_EVENT, script[NAME_FIELD], "Deactivated")
+
+    in_flight = {}
+    restarted = []
+    failures = []
+
+    while (pending and not failures) or in_flight:
+        while pending and not failures and len(in_flight) < max_in_flight:
+            script = pending.pop(0)
+            name = script[NAME_FIELD]
+            progress(RESTARTING_EVENT, name, "")
+
+            try:
+                pid = restart_script(name, scripts_file)
+            # Any error is a failure of this script, the in flight ones must still settle
+            except Exception as e:
+                failures.append(f"{name}: {e}")
+                progress(FAILED_EVENT, name, str(e))
+                break
+
+            in_flight[name] = (pid, monotonic(), script)
+
+        if not in_flight:
+            continue
+
+        sleep(poll_interval)
+
+        for name, (pid, started, script) in list(in_flight.items()):
+            try:
+                if not is_process_alive(pid):
+                    reason = "Exited While Settling"
+                elif monotonic() - started < settle:
+                    continue
+                elif not run_probe(script):
+                    reason = "Probe Failed"
+                else:
+                    reason = None
+            except Exception as e:
+                reason = f"Could Not Check Process [{e}]"
+
+            del in_flight[name]
+
+            if reason is None:
+                restarted.append(name)
+                progress(SETTLED_EVENT, name, f"[{pid}]")
+            else:
+                failures.append(f"{name}: {reason}")
+                progress(FAILED_EVENT, name, f"{reason} [{pid}]")
+
+    if failures:
+        not_restarted = ", ".join(script[NAME_FIELD] for script in pending)
+        progress(ABORTED_EVENT, not_restarted, "")
+        raise RollingRestartFailed(f"Rolling Restart Aborted [{'; '.join(failures)}]")
+
+    progress(DONE_EVENT, ", ".join(restarted), "")
+
+    return restarted
 
 
 def deactivate_script(name: str,
@@ -104,32 +369,32 @@ def deactivate_script(name: str,
         - name: Name of the script to stop
         - scripts_file: Path where the scripts are saved
     """
-    scripts = read_scripts(scripts_file)
+    with file_lock(scripts_file + LOCK_SUFFIX):
+        scripts = read_scripts(scripts_file)
 
-    script_found = False
-    changed_scripts = []
+        script_found = False
+        changed_scripts = []
 
-    for i, script in enumerate(scripts):
-        script_name = script[NAME_FIELD]
+        for i, script in enumerate(scripts):
+            script_name = script[NAME_FIELD]
 
-        if script_name == name:
-            script_found = True
-            script_item = Script.from_dict(script)
+            if script_name == name:
+                script_found = True
+                script_item = Script.from_dict(script)
+                script_item.journal = RunJournal(default_journal_folder(scripts_file))
 
-            if script_item.is_running():
-                kill_process(script_item.last_pid)
+                script_item.stop_process(EVENT_STOP)
 
-            script[PID_FIELD] = None
-            script[LAST_DATE_FIELD] = None
-            script[ACTIVE_FIELD] = False
+                script[PID_FIELD] = None
+                script[LAST_DATE_FIELD] = None
+                script[ACTIVE_FIELD] = False
 
-        changed_scripts.append(script)
+            changed_scripts.append(script)
 
-    if not script_found:
-        raise KeyError(f"Script Name Not Found [{name}]")
+        if not script_found:
+            raise KeyError(f"Script Name Not Found [{name}]")
 
-    with open(scripts_file, "w") as f:
-        f.write(json.dumps(changed_scripts, indent=4))
+        write_scripts(changed_scripts, scripts_file)
 
 
 def activate_script(name: str,
@@ -141,22 +406,22 @@ def activate_script(name: str,
         - name: Name of the script to stop
         - scripts_file: Path where the scripts are saved
     """
-    scripts = read_scripts(scripts_file)
+    with file_lock(scripts_file + LOCK_SUFFIX):
+        scripts = read_scripts(scripts_file)
 
-    script_found = False
-    changed_scripts = []
+        script_found = False
+        changed_scripts = []
 
-    for i, script in enumerate(scripts):
-        script_name = script[NAME_FIELD]
+        for i, script in enumerate(scripts):
+            script_name = script[NAME_FIELD]
 
-        if script_name == name:
-            script_found = True
-            script[ACTIVE_FIELD] = True
+            if script_name == name:
+                script_found = True
+                script[ACTIVE_FIELD] = True
 
-        changed_scripts.append(script)
+            changed_scripts.append(script)
 
-    if not script_found:
-        raise KeyError(f"Script Name Not Found [{name}]")
+        if not script_found:
+            raise KeyError(f"Script Name Not Found [{name}]")
 
-    with open(scripts_file, "w") as f:
-        f.write(json.dumps(changed_scripts, indent=4))
\ No newline at end of file
+        write_scripts(changed_scripts, scripts_file)
@@ -9,12 +9,19 @@ from .constants import DEFAULT_PYTHON_PATH
 from .constants import NAME_FIELD, FILE_FIELD, PID_FIELD, ARG_FIELD
 from .constants import DIRECTORY_FIELD, EXECUTE_FIELD, LOG_FIELD
 from .constants import TIMEOUT_FIELD, LAST_DATE_FIELD
+from .constants import ZYGOTE_FIELD, PRELOAD_FIELD, CAPTURE_FIELD
 from .exceptions import InvalidDirectory, InvalidSavePath, ProcessException
 from .utils import is_process_alive, kill_process, check_valid_pid
+from . import journal
+from . import zygote
 
 import subprocess
 
-SEPARATED_PROCESS = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+if os.name == "nt":
+    SEPARATED_PROCESS = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+else:
+    SEPARATED_PROCESS = 0
+NEW_SESSION = os.name != "nt"
 
 
 class Script():
@@ -27,8 +34,14 @@ class Script():
                  operating_directory: Optional[str] = None,
                  executing_path: str = DEFAULT_PYTHON_PATH,
                  save_path: Optional[str] = None,
-                 arguments: Optional[List[str]] = None):
+                 arguments: Optional[List[str]] = None,
+                 use_zygote: bool = False,
+                 preload: Optional[List[str]] = None,
+                 capture: bool = False):
         self.name = name
+        self.process: Optional[subprocess.Popen] = None
+        self.aggregator = None
+        self.journal = None
 
         if last_pid is not None:
             check_valid_pid(last_pid)
@@ -99,6 +112,22 @@ class Script():
 
         self.arguments = arguments
 
+        if not isinstance(use_zygote, bool):
+            raise TypeError(f"Zygote Flag Must Be A bool [{type(use_zygote)}]")
+
+        if preload is None:
+            preload = []
+        elif not isinstance(preload, list):
+            raise TypeError(f"Preload Must Be A List [{type(preload)}]")
+
+        self.use_zygote = use_zygote
+        self.preload = preload
+
+        if not isinstance(capture, bool):
+            raise TypeError(f"Capture Flag Must Be A bool [{type(capture)}]")
+
+        self.capture = capture
+
     def create_script_path(self):
         """
         Create the string to run the script
@@ -110,28 +139,97 @@ class Script():
 
         return script_path
 
+    def is_capturing(self):
+        """
+        Returns a bool indicating if the output is read through
+        pipes by a log aggregator instead of written to a file
+        """
+        return self.capture and self.aggregator is not None
+
+    def capture_path(self):
+        """
+        Returns the rotating log shared by every run of the script
+        """
+        return os.path.join(os.path.dirname(self.save_path), f"{self.name}.log")
+
     def start_script(self):
         """
         Run the script and stores the last saved pid.
         """
+        if self.use_zygote and zygote.is_supported():
+            self.last_pid = self.start_from_zygote()
+            self.last_time = datetime.datetime.now()
+            self.process = None
+            return
+
         script_str = self.create_script_path()
 
         script_args = script_str.split(" ")
 
-        save_path = open(self.save_path, "w")
+        if self.is_capturing():
+            stdout = subprocess.PIPE
+            stderr = subprocess.PIPE
+        else:
+            stdout = open(self.save_path, "w")
+            stderr = stdout
 
         try:
             script_process = subprocess.Popen(script_args,
-                                              stdout=save_path,
-                                              stderr=save_path,
+                                              stdout=stdout,
+                                              stderr=stderr,
                                               creationflags=SEPARATED_PROCESS,
+                                              start_new_session=NEW_SESSION,
                                               cwd=self.directory)
         except Exception as e:
             raise ProcessException(f"Issue With Process [{e}]")
 
+        if self.is_capturing():
+            self.aggregator.attach(self.name,
+                                   self.capture_path(),
+                                   script_process.stdout,
+                                   script_process.stderr)
+
+        self.process = script_process
         self.last_pid = script_process.pid
         self.last_time = datetime.datetime.now()
 
+    def start_from_zygote(self):
+        """
+        Fork the script from the warm zygote of its interpreter
+        and return the new pid
+        """
+        script_zygote = zygote.get_zygote(self.executing_path, self.preload)
+
+        if not self.is_capturing():
+            return script_zygote.launch(self.file_path,
+                                        self.directory,
+                                        self.arguments,
+                                        self.save_path)
+
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+
+        try:
+            pid = script_zygote.launch(self.file_path,
+                                       self.directory,
+                                       self.arguments,
+                                       stdout_fd=stdout_write,
+                                       stderr_fd=stderr_write)
+        except Exception:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            raise
+        finally:
+            os.close(stdout_write)
+            os.close(stderr_write)
+
+        self.aggregator.attach(self.name,
+                               self.capture_path(),
+                               open(stdout_read, "rb", buffering=0),
+                               open(stderr_read, "rb", buffering=0))
+
+        return pid
+
     def is_running(self):
         """
         Returns a bool indicating if the process is
@@ -140,6 +238,9 @@ class Script():
         if self.last_pid is None:
             return False
 
+        if self.process is not None:
+            self.process.poll()
+
         return is_process_alive(self.last_pid)
 
     def should_restart(self):
@@ -163,16 +264,55 @@ class Script():
         if gap.total_seconds() >= self.timeout:
             return True
 
-    def restart_process(self):
+    def exit_status(self):
         """
-        Restarts the current process
+        Returns the exit status of the last process if it's
+        known, as it's only the case for our own children
         """
-        is_running = self.is_running()
+        if self.process is None:
+            return None
+
+        return self.process.poll()
+
+    def record(self,
+               event: int,
+               reason: int = journal.REASON_FIRST,
+               exit_status: Optional[int] = None):
+        """
+        Append an event of the last process to the run journal, if any
+
+        Parameters:
+            - event: One of the journal EVENT constants
+            - reason: One of the journal REASON constants
+            - exit_status: Exit status of the process, if known
+        """
+        if self.journal is None:
+            return
+
+        self.journal.append(self.name, event, self.last_pid, reason, exit_status)
 
-        if is_running:
+    def stop_process(self,
+                     event: int = journal.EVENT_KILL):
+        """
+        Stops the current process if it's running
+
+        Parameters:
+            - event: Journal event to record for the stop
+        """
+        if self.is_running():
             kill_process(self.last_pid)
+            self.record(event)
+        elif self.last_pid is not None:
+            self.record(journal.EVENT_EXIT, exit_status=self.exit_status())
+
+    def restart_process(self):
+        """
+        Restarts the current process
+        """
+        self.stop_process()
 
         self.start_script()
+        self.record(journal.EVENT_START, journal.REASON_MANUAL)
 
     def check_script_alive(self):
         """
@@ -187,8 +327,16 @@ class Script():
 
         if is_running and should_restart:
             kill_process(self.last_pid)
+            self.record(journal.EVENT_KILL)
+            reason = journal.REASON_TIMEOUT
+        elif self.last_pid is not None:
+            self.record(journal.EVENT_EXIT, exit_status=self.exit_status())
+            reason = journal.REASON_EXITED
+        else:
+            reason = journal.REASON_FIRST
 
         self.start_script()
+        self.record(journal.EVENT_START, reason)
 
         return self.last_pid
 
@@ -207,6 +355,9 @@ class Script():
         script_dict[ARG_FIELD] = self.arguments
         script_dict[TIMEOUT_FIELD] = self.timeout
         script_dict[LAST_DATE_FIELD] = self.last_time
+        script_dict[ZYGOTE_FIELD] = self.use_zygote
+        script_dict[PRELOAD_FIELD] = self.preload
+        script_dict[CAPTURE_FIELD] = self.capture
 
         return script_dict
 
@@ -235,6 +386,9 @@ class Script():
         script_arguments = script_dict.get(ARG_FIELD, None)
         script_timeout = script_dict.get(TIMEOUT_FIELD, None)
         script_last_time = script_dict.get(LAST_DATE_FIELD, None)
+        script_zygote = script_dict.get(ZYGOTE_FIELD, False)
+        script_preload = script_dict.get(PRELOAD_FIELD, None)
+        script_capture = script_dict.get(CAPTURE_FIELD, False)
 
         return Script(script_name,
                       script_file,
@@ -244,4 +398,7 @@ class Script():
                       script_directory,
                       script_exec_path,
                       script_save_path,
-                      script_arguments,)
+                      script_arguments,
+                      script_zygote,
+                      script_preload,
+                      script_capture)
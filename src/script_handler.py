@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional
 
 import datetime
 
@@ -8,61 +8,259 @@ import json
 
 from .exceptions import MissingScriptsFile, InvalidScriptsFile
 from .script import Script
-from .constants import PID_FIELD, ACTIVE_FIELD, LAST_DATE_FIELD
+from .log_aggregator import LogAggregator
+from .journal import RunJournal, default_journal_folder
+from .sharding import ShardCoordinator
+from .utils import file_lock
+from .constants import NAME_FIELD, PID_FIELD, ACTIVE_FIELD, LAST_DATE_FIELD, LOCK_SUFFIX, RESTART_FIELD
 
 import sys
 
+from time import sleep
+
 IMPORT_PATH = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)
 sys.path.append(IMPORT_PATH)
 
+# Fields changed while the script runs, the rest define the script
+STATE_FIELDS = (PID_FIELD, LAST_DATE_FIELD, ACTIVE_FIELD, RESTART_FIELD)
+
 
-from Publisher.publisher import Publisher
+def script_definition(script_data: dict):
+    """
+    Returns the stored data of a script without its state fields
+
+    Parameters:
+        - script_data: Stored data of the script
+    """
+    return {key: value for key, value in script_data.items() if key not in STATE_FIELDS}
 
 
 class ScriptHandler():
     def __init__(self,
-                 scripts_path: str) -> None:
+                 scripts_path: str,
+                 aggregator: Optional[LogAggregator] = None,
+                 journal: Optional[RunJournal] = None,
+                 coordinator: Optional[ShardCoordinator] = None) -> None:
         self.scripts_path = scripts_path
+        self.lock_path = scripts_path + LOCK_SUFFIX
+        self.aggregator = aggregator
+        self.coordinator = coordinator
+
+        if journal is None:
+            journal = RunJournal(default_journal_folder(scripts_path))
+        self.journal = journal
+
         self.scripts_dicts = []
         self.scripts: List[Script] = []
+        # Data every script was built with, to notice edits
+        self.definitions: Dict[str, dict] = {}
 
         self.read_scripts()
 
-    def read_scripts(self):
+    def load_scripts_file(self):
         """
-        Read the scripts json file and set the scripts list
-        with the data
+        Returns the list stored in the scripts json file.
+        The lock file must be held while reading it.
         """
         if not os.path.isfile(self.scripts_path):
             raise MissingScriptsFile(f"Must Have A Valid Scripts File Path [{self.scripts_path}]")
 
         try:
             with open(self.scripts_path, "r", encoding="utf-8") as f:
-                self.scripts_dicts = json.load(f)
+                scripts_dicts = json.load(f)
         except json.JSONDecodeError:
             raise InvalidScriptsFile(f"Scripts File Not A Valid JSON")
 
-        if not isinstance(self.scripts_dicts, list):
-            raise InvalidScriptsFile(f"Scripts File Must Be A JSON List [{type(self.scripts_dicts)}]")
+        if not isinstance(scripts_dicts, list):
+            raise InvalidScriptsFile(f"Scripts File Must Be A JSON List [{type(scripts_dicts)}]")
+
+        return scripts_dicts
+
+    def read_scripts(self):
+        """
+        Read the scripts json file and set the scripts list
+        with the data
+        """
+        with file_lock(self.lock_path):
+            self.scripts_dicts = self.load_scripts_file()
 
         self.scripts = []
 
         for script_data in self.scripts_dicts:
             active = script_data.get(ACTIVE_FIELD, True)
-            script = Script.from_dict(script_data)
-            self.scripts.append((script, active))
+            self.scripts.append((self.create_script(script_data), active))
+
+    def create_script(self,
+                      script_data: dict):
+        """
+        Returns the Script of the stored data, using our
+        aggregator and journal
+
+        Parameters:
+            - script_data: Stored data of the script
+        """
+        script = Script.from_dict(script_data)
+        script.aggregator = self.aggregator
+        script.journal = self.journal
+        self.definitions[script.name] = script_definition(script_data)
+        return script
+
+    def sync_scripts(self):
+        """
+        Read the scripts file again, so changes done meanwhile are
+        followed. New scripts are added, removed ones dropped and
+        edited ones built again. For the others only the pids, dates
+        and active flags are refreshed, keeping their processes.
+        Invalid scripts are left out until they are fixed.
+        """
+        with file_lock(self.lock_path):
+            stored_dicts = self.load_scripts_file()
+
+        indexes = {}
+        for i, (script, _) in enumerate(self.scripts):
+            indexes[script.name] = i
+
+        scripts = []
+        scripts_dicts = []
+
+        for script_data in stored_dicts:
+            name = script_data.get(NAME_FIELD, None)
+            index = indexes.get(name, None)
+
+            if index is not None and self.definitions.get(name, None) == script_definition(script_data):
+                self.sync_script(index, script_data)
+                script, active = self.scripts[index]
+            else:
+                try:
+                    script = self.create_script(script_data)
+                except (OSError, TypeError, KeyError, ValueError) as e:
+                    print(f"Invalid Script Left Out [{name}] [{e}]")
+                    continue
+                active = script_data.get(ACTIVE_FIELD, True)
+
+            scripts.append((script, active))
+            scripts_dicts.append(script_data)
+
+        self.scripts = scripts
+        self.scripts_dicts = scripts_dicts
+        self.definitions = {script.name: self.definitions[script.name] for script, _ in scripts}
+
+    def sync_script(self,
+                    index: int,
+                    script_data: dict):
+        """
+        Refresh a script with the data stored in the scripts file
+
+        Parameters:
+            - index: Position of the script in the scripts list
+            - script_data: Stored data of the script
+        """
+        script, _ = self.scripts[index]
 
-    def update_scripts_dict(self):
+        stored_pid = script_data.get(PID_FIELD, None)
+        if stored_pid != script.last_pid:
+            stored_date = script_data.get(LAST_DATE_FIELD, None)
+            script.last_pid = stored_pid
+            script.process = None
+            if stored_date is None:
+                script.last_time = None
+            else:
+                script.last_time = datetime.datetime.fromisoformat(stored_date)
+
+        active = script_data.get(ACTIVE_FIELD, True)
+        self.scripts[index] = (script, active)
+        self.scripts_dicts[index] = script_data
+
+    def write_scripts_file(self,
+                           stored_dicts: List[dict],
+                           names: Optional[List[str]] = None):
         """
-        Stored the update scripts dict in the script save path
+        Replace the given scripts in the stored list with ours and
+        write it. The lock file must be held while calling it.
+
+        Parameters:
+            - stored_dicts: Scripts as read from the scripts file
+            - names: Names of the scripts to replace, all by default
         """
+        for script_data in self.scripts_dicts:
+            if names is not None and script_data[NAME_FIELD] not in names:
+                continue
+
+            for i, stored_data in enumerate(stored_dicts):
+                if stored_data[NAME_FIELD] == script_data[NAME_FIELD]:
+                    stored_dicts[i] = script_data
+
         with open(self.scripts_path, "w") as f:
-            f.write(json.dumps(self.scripts_dicts, indent=4))
+            f.write(json.dumps(stored_dicts, indent=4))
+
+    def update_scripts_dict(self,
+                            names: Optional[List[str]] = None):
+        """
+        Stored the update scripts dict in the script save path.
+        Only the given scripts are replaced, so changes done to
+        the others by other processes are kept.
+
+        Parameters:
+            - names: Names of the scripts to store, all by default
+        """
+        with file_lock(self.lock_path):
+            self.write_scripts_file(self.load_scripts_file(), names)
+
+    def check_script(self,
+                     index: int):
+        """
+        Restart the script if it's needed and store its new pid.
+        The stored data is read again under the lock first, so a
+        restart done meanwhile by the manual handler is adopted
+        instead of starting a second process. Restarts requested
+        by the manual handler are done here, so the output of
+        captured scripts keeps going through our aggregator.
+        Returns the new pid, or None if it wasn't restarted.
+
+        Parameters:
+            - index: Position of the script in the scripts list
+        """
+        script, _ = self.scripts[index]
+
+        with file_lock(self.lock_path):
+            stored_dicts = self.load_scripts_file()
 
-    def check_scripts(self):
+            for script_data in stored_dicts:
+                if script_data[NAME_FIELD] == script.name:
+                    self.sync_script(index, script_data)
+                    break
+            else:
+                return None
+
+            _, active = self.scripts[index]
+            if not active:
+                return None
+
+            if script_data.get(RESTART_FIELD, False):
+                script.restart_process()
+                new_pid = script.last_pid
+                del script_data[RESTART_FIELD]
+            else:
+                new_pid = script.check_script_alive()
+                if new_pid is None:
+                    return None
+
+            self.scripts_dicts[index][PID_FIELD] = new_pid
+            if script.last_time is not None:
+                self.scripts_dicts[index][LAST_DATE_FIELD] = script.last_time.isoformat()
+
+            self.write_scripts_file(stored_dicts, [script.name])
+
+        return new_pid
+
+    def check_scripts(self,
+                      report_idle: bool = True):
         """
         Check if all the scripts are running. In case some it's not,
         it restarts it.
+
+        Parameters:
+            - report_idle: Print it also when nothing was restarted
         """
         processes_updated = False
         processes_text = ""
@@ -70,18 +268,22 @@ class ScriptHandler():
         for i, (script, active) in enumerate(self.scripts):
             if not active:
                 continue
-            new_pid = script.check_script_alive()
+            if self.coordinator is not None and not self.coordinator.owns(script.name):
+                continue
+            restart_requested = self.scripts_dicts[i].get(RESTART_FIELD, False)
+            if script.is_running() and not script.should_restart() and not restart_requested:
+                continue
+            new_pid = self.check_script(i)
             if new_pid is not None:
                 processes_updated = True
                 processes_text += f"{script.name} Has Been Restarted\n"
-                self.scripts_dicts[i][PID_FIELD] = new_pid
-                if script.last_time is not None:
-                    self.scripts_dicts[i][LAST_DATE_FIELD] = script.last_time.isoformat()
-                self.update_scripts_dict()
 
-        print(processes_text)
+        if processes_updated or report_idle:
+            print(processes_text)
 
         if processes_updated:
+            from Publisher.publisher import Publisher
+
             now = datetime.datetime.now()
 
             topic = "Script Handler"
@@ -90,5 +292,27 @@ class ScriptHandler():
             publisher = Publisher(topic, subject, processes_text)
             print(vars(publisher))
             publisher.publish()
-        else:
+        elif report_idle:
             print("Nothing Happened")
+
+    def watch(self,
+              interval: float):
+        """
+        Keep the scripts alive, checking them every interval seconds.
+        Needed for captured output, as the pipes are read by this process.
+        With a coordinator, only the scripts of this shard are checked
+        and the ring is refreshed often enough to follow the others.
+
+        Parameters:
+            - interval: Seconds between checks
+        """
+        if self.coordinator is not None:
+            self.coordinator.join()
+            interval = min(interval, self.coordinator.refresh_interval)
+
+        while True:
+            if self.coordinator is not None:
+                self.coordinator.refresh()
+            self.sync_scripts()
+            self.check_scripts(report_idle=False)
+            sleep(interval)
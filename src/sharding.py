@@ -0,0 +1,322 @@
+import bisect
+import hashlib
+import json
+import os
+import socket
+
+from typing import Dict, List, Optional, Tuple
+
+from .exceptions import ShardException
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LEASE_SUFFIX = ".lease"
+LEASE_PERIOD = 30
+VIRTUAL_NODES = 64
+
+
+def ring_hash(key: str):
+    """
+    Returns the position of a key in the hash ring
+
+    Parameters:
+        - key: Text to place in the ring
+    """
+    digest = hashlib.md5(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def try_lock(file):
+    """
+    Try to take an exclusive lock on the file without waiting.
+    Returns a bool indicating if the lock was taken.
+
+    Parameters:
+        - file: Open file to lock
+    """
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+
+    return True
+
+
+class ShardCoordinator():
+    def __init__(self,
+                 folder: str,
+                 supervisor_id: Optional[str] = None,
+                 lease_period: float = LEASE_PERIOD,
+                 virtual_nodes: int = VIRTUAL_NODES) -> None:
+        if fcntl is None:
+            raise ShardException("Sharding Needs fcntl File Locks")
+
+        if supervisor_id is None:
+            supervisor_id = f"{socket.gethostname()}-{os.getpid()}"
+
+        if not supervisor_id or os.sep in supervisor_id or "/" in supervisor_id:
+            raise ValueError(f"Invalid Supervisor Id [{supervisor_id}]")
+
+        if lease_period <= 0:
+            raise ValueError(f"Lease Period Must Be Positive [{lease_period}]")
+
+        os.makedirs(folder, exist_ok=True)
+
+        self.folder = folder
+        self.supervisor_id = supervisor_id
+        self.lease_period = lease_period
+        # A dead supervisor releases its lock right away, refreshing
+        # three times per period moves its scripts within one period
+        self.refresh_interval = lease_period / 3
+        self.virtual_nodes = virtual_nodes
+
+        self.lease_path = os.path.join(folder, f"{supervisor_id}{LEASE_SUFFIX}")
+        self.lease_file = None
+        self.members: List[str] = []
+        self.ring: List[Tuple[int, str]] = []
+
+    def join(self):
+        """
+        Create and lock the lease file of this supervisor and
+        build the ring. The lock is held until leave is called
+        or the process dies. Raises ShardException if a live
+        supervisor of another host uses the folder.
+        """
+        if self.lease_file is not None:
+            return
+
+        for lease_path in self.other_leases():
+            if self.is_alive(lease_path):
+                self.check_same_host(lease_path)
+
+        self.create_lease()
+        self.refresh()
+
+    def create_lease(self):
+        """
+        Create the lease file of this supervisor, locked
+        """
+        temp_path = f"{self.lease_path}.{os.getpid()}.tmp"
+        lease_file = open(temp_path, "w")
+
+        if not try_lock(lease_file):
+            lease_file.close()
+            raise ShardException(f"Could Not Lock Lease [{temp_path}]")
+
+        lease_info = {}
+        lease_info["id"] = self.supervisor_id
+        lease_info["host"] = socket.gethostname()
+        lease_info["pid"] = os.getpid()
+        lease_file.write(json.dumps(lease_info))
+        lease_file.flush()
+
+        if os.path.exists(self.lease_path) and self.is_alive(self.lease_path):
+            lease_file.close()
+            os.remove(temp_path)
+            raise ShardException(f"Supervisor Id Already In Use [{self.supervisor_id}]")
+
+        # Renaming a locked file means no one can see it unlocked
+        os.replace(temp_path, self.lease_path)
+        self.lease_file = lease_file
+
+    def keep_lease(self):
+        """
+        Make sure the locked lease of this supervisor is still the
+        one in the folder, taking a new one if it was removed.
+        Only the lock tells if a lease is alive, so it needs no renewal.
+        """
+        if self.lease_file is None:
+            raise ShardException(f"Supervisor Has Not Joined [{self.supervisor_id}]")
+
+        try:
+            lease_kept = os.path.samestat(os.fstat(self.lease_file.fileno()), os.stat(self.lease_path))
+        except FileNotFoundError:
+            lease_kept = False
+
+        if lease_kept:
+            return
+
+        # Someone removed our lease file, take a new one
+        self.lease_file.close()
+        self.lease_file = None
+        self.create_lease()
+
+    def leave(self):
+        """
+        Remove the lease, so the scripts move to the other supervisors
+        """
+        if self.lease_file is None:
+            return
+
+        try:
+            os.remove(self.lease_path)
+        except FileNotFoundError:
+            pass
+
+        self.lease_file.close()
+        self.lease_file = None
+        self.members = []
+        self.ring = []
+
+    def is_alive(self,
+                 lease_path: str):
+        """
+        Returns a bool indicating if a lease is held by a live supervisor.
+        Only the lock is trusted, so neither clock differences nor a
+        stalled supervisor make a held lease look dead. The lock is
+        released right away if its process dies. Dead leases are removed.
+
+        Parameters:
+            - lease_path: Lease file to check
+        """
+        try:
+            lease_file = open(lease_path, "r")
+        except FileNotFoundError:
+            return False
+
+        with lease_file:
+            if not try_lock(lease_file):
+                return True
+
+            # Only remove it if it's still the same file we checked
+            try:
+                if os.path.samestat(os.fstat(lease_file.fileno()), os.stat(lease_path)):
+                    os.remove(lease_path)
+            except FileNotFoundError:
+                pass
+
+        return False
+
+    def lease_host(self,
+                   lease_path: str):
+        """
+        Returns the host of the supervisor of a lease, or None
+        if it can't be read
+
+        Parameters:
+            - lease_path: Lease file to read
+        """
+        try:
+            with open(lease_path, "r") as f:
+                lease_info = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        return lease_info.get("host", None)
+
+    def is_same_host(self,
+                     lease_path: str):
+        """
+        Returns a bool indicating if the lease belongs to a supervisor
+        on this host. Leases that can't be read yet count as local.
+
+        Parameters:
+            - lease_path: Lease file to check
+        """
+        host = self.lease_host(lease_path)
+        return host is None or host == socket.gethostname()
+
+    def check_same_host(self,
+                        lease_path: str):
+        """
+        Raise an Exception in case the lease belongs to a supervisor
+        on another host. Stored pids are only meaningful on the host
+        that started them, so all supervisors must share one host.
+
+        Parameters:
+            - lease_path: Lease file to check
+        """
+        if not self.is_same_host(lease_path):
+            raise ShardException(f"Supervisors Must Run On The Same Host [{self.lease_host(lease_path)}]")
+
+    def other_leases(self):
+        """
+        Returns the lease paths of the other supervisors in the folder
+        """
+        lease_paths = []
+
+        for filename in os.listdir(self.folder):
+            if filename.endswith(LEASE_SUFFIX) and filename != os.path.basename(self.lease_path):
+                lease_paths.append(os.path.join(self.folder, filename))
+
+        return lease_paths
+
+    def refresh(self):
+        """
+        Check the lease and rebuild the ring with the live supervisors.
+        Leases of another host are left out with a warning, so one
+        misconfigured supervisor doesn't stop the ones running here.
+        Returns the list of members.
+        """
+        self.keep_lease()
+
+        members = [self.supervisor_id]
+
+        for lease_path in self.other_leases():
+            if not self.is_alive(lease_path):
+                continue
+
+            if not self.is_same_host(lease_path):
+                print(f"Ignoring Supervisor Of Another Host [{lease_path}] [{self.lease_host(lease_path)}]")
+                continue
+
+            members.append(os.path.basename(lease_path)[:-len(LEASE_SUFFIX)])
+
+        members.sort()
+
+        ring = []
+        for member in members:
+            for i in range(self.virtual_nodes):
+                ring.append((ring_hash(f"{member}#{i}"), member))
+        ring.sort()
+
+        self.members = members
+        self.ring = ring
+
+        return members
+
+    def owner(self,
+              name: str):
+        """
+        Returns the supervisor that owns the given script,
+        according to the last refresh
+
+        Parameters:
+            - name: Name of the script
+        """
+        if not self.ring:
+            return None
+
+        position = bisect.bisect(self.ring, (ring_hash(name), ""))
+        if position == len(self.ring):
+            position = 0
+
+        return self.ring[position][1]
+
+    def owns(self,
+             name: str):
+        """
+        Returns a bool indicating if this supervisor owns the script
+
+        Parameters:
+            - name: Name of the script
+        """
+        return self.owner(name) == self.supervisor_id
+
+    def assignment(self,
+                   names: List[str]) -> Dict[str, List[str]]:
+        """
+        Returns the scripts owned by every member
+
+        Parameters:
+            - names: Names of the scripts
+        """
+        assignment = {member: [] for member in self.members}
+
+        for name in names:
+            assignment[self.owner(name)].append(name)
+
+        return assignment
@@ -1,8 +1,15 @@
 import psutil
 
+import contextlib
 import os
 import signal
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
 from .exceptions import ProcessException
 
 
@@ -49,4 +56,30 @@ def kill_process(pid: int):
     try:
         os.kill(pid, signal.SIGTERM)
     except OSError:
-        raise ProcessException(f"Could Not Finish Process [{pid}]")
\ No newline at end of file
+        raise ProcessException(f"Could Not Finish Process [{pid}]")
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on the given file while inside the block.
+    The file is created if it doesn't exist.
+
+    Parameters:
+        - path: Lock file path
+    """
+    with open(path, "a+") as f:
+        f.seek(0)
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            f.seek(0)
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
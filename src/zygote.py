@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import socket
+import stat
+import subprocess
+import tempfile
+
+from time import sleep, monotonic
+
+from typing import Dict, List, Optional, Tuple
+
+from .exceptions import ZygoteException
+from .utils import file_lock
+
+SERVER_FILE = os.path.join(os.path.dirname(__file__), "zygote_server.py")
+RUNTIME_FOLDER_NAME = "script_handler_zygotes"
+LOCK_SUFFIX = ".lock"
+
+START_TIMEOUT = 30
+CONNECT_TIMEOUT = 10
+MAX_REPLY = 65536
+
+_ZYGOTES: Dict[Tuple[str, Tuple[str, ...]], "Zygote"] = {}
+
+
+def is_supported():
+    """
+    Returns a bool indicating if this platform can run zygotes.
+    Forking and passing descriptors over unix sockets is needed.
+    """
+    return hasattr(os, "fork") and hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+
+def default_runtime_folder():
+    """
+    Returns the folder of this user where the zygote sockets live.
+    $XDG_RUNTIME_DIR is used if set, otherwise a folder with the
+    user id in the temp folder.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", None)
+    if runtime_dir:
+        return os.path.join(runtime_dir, RUNTIME_FOLDER_NAME)
+
+    return os.path.join(tempfile.gettempdir(), f"{RUNTIME_FOLDER_NAME}_{os.getuid()}")
+
+
+def check_owned(path: str,
+                private: bool = False):
+    """
+    Raise an Exception in case the path is not owned by this user,
+    or is a symlink, or is reachable by others when private
+
+    Parameters:
+        - path: Path to check
+        - private: If group and others must have no permissions
+    """
+    path_stat = os.lstat(path)
+
+    if stat.S_ISLNK(path_stat.st_mode):
+        raise ZygoteException(f"Zygote Path Must Not Be A Symlink [{path}]")
+
+    if path_stat.st_uid != os.getuid():
+        raise ZygoteException(f"Zygote Path Owned By Another User [{path}]")
+
+    if private and path_stat.st_mode & 0o077:
+        raise ZygoteException(f"Zygote Folder Must Only Be Accessible By Its Owner [{path}]")
+
+
+class Zygote():
+    def __init__(self,
+                 executing_path: str,
+                 preload: Optional[List[str]] = None,
+                 runtime_folder: Optional[str] = None) -> None:
+        if preload is None:
+            preload = []
+        elif not isinstance(preload, list):
+            raise TypeError(f"Preload Must Be A List [{type(preload)}]")
+
+        self.executing_path = executing_path
+        self.preload = preload
+
+        if runtime_folder is None:
+            runtime_folder = default_runtime_folder()
+
+        os.makedirs(runtime_folder, mode=0o700, exist_ok=True)
+        check_owned(runtime_folder, private=True)
+
+        key = f"{executing_path}\0{','.join(sorted(preload))}"
+        key = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+        self.socket_path = os.path.join(runtime_folder, f"{key}.sock")
+        self.log_path = os.path.join(runtime_folder, f"{key}.log")
+        self.lock_path = os.path.join(runtime_folder, f"{key}{LOCK_SUFFIX}")
+
+    def connect(self):
+        """
+        Returns a socket connected to the zygote server.
+        Raises OSError if the server is not listening, and
+        ZygoteException if the socket is not owned by this user.
+        """
+        check_owned(self.socket_path)
+
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(CONNECT_TIMEOUT)
+
+        try:
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+
+        return connection
+
+    def request(self,
+                request: dict,
+                fds: Optional[List[int]] = None,
+                connection: Optional[socket.socket] = None):
+        """
+        Send a request to the zygote and return its reply
+
+        Parameters:
+            - request: Dictionary to send as JSON
+            - fds: File descriptors to hand over with the request
+            - connection: Already connected socket to use, it's closed after
+        """
+        if fds is None:
+            fds = []
+
+        if connection is None:
+            connection = self.connect()
+
+        message = json.dumps(request).encode() + b"\n"
+
+        with connection:
+            socket.send_fds(connection, [message], fds)
+
+            reply = b""
+            while not reply.endswith(b"\n"):
+                chunk = connection.recv(MAX_REPLY)
+                if not chunk:
+                    break
+                reply += chunk
+
+        try:
+            return json.loads(reply)
+        except json.JSONDecodeError:
+            raise ZygoteException(f"Invalid Zygote Reply [{reply}]")
+
+    def is_running(self):
+        """
+        Returns a bool indicating if the zygote is accepting requests.
+        The zygote takes a connection without a request as a ping.
+        """
+        try:
+            self.connect().close()
+        except ZygoteException:
+            raise
+        except OSError:
+            return False
+
+        return True
+
+    def start(self,
+              timeout: float = START_TIMEOUT):
+        """
+        Start the zygote server in its own session and wait
+        until it accepts requests
+
+        Parameters:
+            - timeout: Seconds to wait for the zygote to be ready
+        """
+        server_args = [self.executing_path, "-u", SERVER_FILE, self.socket_path]
+        server_args += self.preload
+
+        log_file = open(self.log_path, "a")
+
+        try:
+            subprocess.Popen(server_args,
+                             stdin=subprocess.DEVNULL,
+                             stdout=log_file,
+                             stderr=log_file,
+                             start_new_session=True)
+        except Exception as e:
+            raise ZygoteException(f"Could Not Start Zygote [{e}]")
+        finally:
+            log_file.close()
+
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            if self.is_running():
+                return
+            sleep(0.05)
+
+        raise ZygoteException(f"Zygote Did Not Start In Time [{self.log_path}]")
+
+    def ensure_running(self):
+        """
+        Start the zygote if it's not already running. The lock
+        keeps two supervisors from starting one each at once.
+        """
+        if self.is_running():
+            return
+
+        with file_lock(self.lock_path):
+            if not self.is_running():
+                self.start()
+
+    def launch(self,
+               file_path: str,
+               directory: str,
+               arguments: List[str],
+               log_path: Optional[str] = None,
+               stdout_fd: Optional[int] = None,
+               stderr_fd: Optional[int] = None):
+        """
+        Fork a child from the zygote that runs the given file
+        and return its pid.
+
+        Output goes to log_path, unless both stdout_fd and
+        stderr_fd are given, in which case those are used.
+        A zygote whose preloaded modules changed on disk is
+        replaced first, so the child runs the current code.
+
+        Parameters:
+            - file_path: File to run, relative to directory or absolute
+            - directory: Operating directory of the child
+            - arguments: Arguments for the script
+            - log_path: File where stdout and stderr are written
+            - stdout_fd: Descriptor to use as the child stdout
+            - stderr_fd: Descriptor to use as the child stderr
+        """
+        request = {}
+        request["file_path"] = file_path
+        request["directory"] = directory
+        request["arguments"] = arguments
+        request["log_path"] = log_path
+
+        fds = []
+        if stdout_fd is not None and stderr_fd is not None:
+            fds = [stdout_fd, stderr_fd]
+        elif log_path is None:
+            raise ValueError("Must Provide A Log Path Or Output Descriptors")
+
+        # One connection per launch, a second try only follows starting a new zygote
+        for _ in range(2):
+            try:
+                connection = self.connect()
+            except ZygoteException:
+                raise
+            except OSError:
+                self.ensure_running()
+                connection = None
+
+            try:
+                reply = self.request(request, fds, connection)
+            except ZygoteException:
+                raise
+            except OSError as e:
+                raise ZygoteException(f"Issue With Zygote [{e}]")
+
+            if not reply.get("stale", False):
+                break
+
+        if "pid" not in reply:
+            raise ZygoteException(f"Zygote Could Not Fork [{reply.get('error')}]")
+
+        return reply["pid"]
+
+    def stop(self):
+        """
+        Stop the zygote server. Already forked children keep running.
+        """
+        try:
+            self.request({"command": "stop"})
+        except OSError:
+            pass
+
+
+def get_zygote(executing_path: str,
+               preload: Optional[List[str]] = None):
+    """
+    Returns the shared zygote for an interpreter and preload list
+
+    Parameters:
+        - executing_path: Interpreter that runs the zygote
+        - preload: Modules the zygote imports before forking
+    """
+    if preload is None:
+        preload = []
+
+    key = (executing_path, tuple(preload))
+
+    if key not in _ZYGOTES:
+        _ZYGOTES[key] = Zygote(executing_path, preload)
+
+    return _ZYGOTES[key]
@@ -0,0 +1,228 @@
+import atexit
+import importlib
+import json
+import os
+import runpy
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+MAX_MESSAGE = 65536
+MAX_FDS = 2
+
+
+def read_request(connection: socket.socket):
+    """
+    Read a newline terminated JSON request from the connection,
+    together with the file descriptors sent along with it.
+    The request is None when the client sent nothing, which
+    is how it checks that we are accepting connections.
+
+    Parameters:
+        - connection: Accepted client connection
+    """
+    message, fds, _, _ = socket.recv_fds(connection, MAX_MESSAGE, MAX_FDS)
+
+    if not message:
+        return None, fds
+
+    while not message.endswith(b"\n"):
+        chunk = connection.recv(MAX_MESSAGE)
+        if not chunk:
+            break
+        message += chunk
+
+    return json.loads(message), fds
+
+
+def module_mtimes():
+    """
+    Returns the modification time of the file of every loaded module
+    """
+    mtimes = {}
+
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if not path:
+            continue
+
+        try:
+            mtimes[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+
+    return mtimes
+
+
+def is_stale(mtimes: dict):
+    """
+    Returns a bool indicating if any of the loaded module
+    files changed since they were imported
+
+    Parameters:
+        - mtimes: Modification times returned by module_mtimes
+    """
+    for path, mtime in mtimes.items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return True
+        except OSError:
+            return True
+
+    return False
+
+
+def run_child(request: dict,
+              fds: list):
+    """
+    Runs inside the forked child. It prepares the process the same way
+    `python -u file.py` would and never returns.
+
+    Parameters:
+        - request: Launch request sent by the supervisor
+        - fds: Optional stdout and stderr descriptors sent by the supervisor
+    """
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    os.setsid()
+
+    directory = request["directory"]
+    file_path = request["file_path"]
+
+    os.chdir(directory)
+
+    if len(fds) == MAX_FDS:
+        stdout_fd, stderr_fd = fds
+    else:
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        stdout_fd = os.open(request["log_path"], flags, 0o644)
+        stderr_fd = stdout_fd
+
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+
+    for fd in {null_fd, stdout_fd, stderr_fd}:
+        if fd > 2:
+            os.close(fd)
+
+    sys.argv = [file_path] + request.get("arguments", [])
+    sys.path[0] = os.path.dirname(os.path.abspath(file_path))
+
+    exit_code = 0
+    try:
+        runpy.run_path(file_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+
+    # Same shutdown as the interpreter does: wait for the
+    # non daemon threads and then run the atexit handlers
+    try:
+        threading._shutdown()
+    except BaseException:
+        traceback.print_exc()
+
+    atexit._run_exitfuncs()
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(exit_code)
+
+
+def serve(socket_path: str,
+          modules: list):
+    """
+    Pre-import the given modules and fork a child for every
+    launch request received on the socket. If a loaded module
+    changed on disk, launch requests are refused with a stale
+    reply and we stop, so the supervisor starts a fresh zygote.
+
+    Parameters:
+        - socket_path: Unix socket path to listen on
+        - modules: Modules to import before accepting requests
+    """
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            traceback.print_exc()
+
+    mtimes = module_mtimes()
+
+    # Children are detached from us, let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+
+    print(f"Zygote Ready [{os.getpid()}] [{socket_path}] [{', '.join(modules)}]")
+
+    while True:
+        connection, _ = listener.accept()
+
+        with connection:
+            try:
+                request, fds = read_request(connection)
+            except (OSError, ValueError):
+                traceback.print_exc()
+                continue
+
+            if request is None:
+                continue
+
+            if request.get("command") == "stop":
+                connection.sendall(b'{"stopped": true}\n')
+                break
+
+            if is_stale(mtimes):
+                # Free the socket path before replying, a new zygote may bind it right after
+                listener.close()
+                os.unlink(socket_path)
+                for fd in fds:
+                    os.close(fd)
+                connection.sendall(b'{"stale": true}\n')
+                print(f"Zygote Stopped, Preloaded Modules Changed [{os.getpid()}]")
+                return
+
+            try:
+                pid = os.fork()
+            except OSError as e:
+                reply = {"error": str(e)}
+            else:
+                if pid == 0:
+                    try:
+                        listener.close()
+                        connection.close()
+                        run_child(request, fds)
+                    finally:
+                        os._exit(1)
+                reply = {"pid": pid}
+
+            for fd in fds:
+                os.close(fd)
+
+            connection.sendall(json.dumps(reply).encode() + b"\n")
+
+    listener.close()
+    os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2:])
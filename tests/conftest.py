@@ -0,0 +1,57 @@
+import pytest
+import json
+import sys
+
+from src.utils import is_process_alive, kill_process
+
+SLEEPER = "import time\ntime.sleep(30)\n"
+SCRIPTS_FILE_NAME = "scripts.json"
+
+
+def create_script(tmp_path,
+                  name: str,
+                  file_name: str = "sleeper.py",
+                  **fields):
+    script = {}
+    script["name"] = name
+    script["file_path"] = file_name
+    script["directory"] = str(tmp_path)
+    script["exec_path"] = sys.executable
+    script.update(fields)
+    return script
+
+
+@pytest.fixture
+def sleeper_path(tmp_path):
+    path = tmp_path / "sleeper.py"
+    path.write_text(SLEEPER)
+    return path
+
+
+@pytest.fixture
+def write_scripts_file(tmp_path, sleeper_path):
+    """
+    Returns a function that saves the given scripts in a scripts
+    file and returns its path. The processes of the stored pids
+    are killed once the test is done.
+    """
+    scripts_path = tmp_path / SCRIPTS_FILE_NAME
+
+    def write(scripts: list):
+        scripts_path.write_text(json.dumps(scripts))
+        return str(scripts_path)
+
+    yield write
+
+    if not scripts_path.exists():
+        return
+
+    for script in json.loads(scripts_path.read_text()):
+        pid = script.get("pid", None)
+        if pid is not None and is_process_alive(pid):
+            kill_process(pid)
+
+
+@pytest.fixture
+def scripts_file(tmp_path, write_scripts_file):
+    return write_scripts_file([create_script(tmp_path, "First"), create_script(tmp_path, "Second")])
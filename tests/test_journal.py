@@ -0,0 +1,217 @@
+import pytest
+import os
+import random
+import subprocess
+import sys
+
+from src import journal as journal_module
+from src.journal import RunJournal, RECORD
+from src.journal import EVENT_START, EVENT_EXIT, EVENT_KILL, EVENT_STOP
+from src.journal import REASON_FIRST, REASON_EXITED, REASON_TIMEOUT
+
+REPO_FOLDER = os.path.join(os.path.dirname(__file__), os.pardir)
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = RunJournal(str(tmp_path), segment_records=4)
+
+    # Test: up 0-100, exits, up 110-200, timeout kill, up 200-300
+    journal.append("Test", EVENT_START, 10, REASON_FIRST, timestamp=START)
+    journal.append("Other", EVENT_START, 20, REASON_FIRST, timestamp=START + 5)
+    journal.append("Test", EVENT_EXIT, 10, exit_status=1, timestamp=START + 100)
+    journal.append("Test", EVENT_START, 11, REASON_EXITED, timestamp=START + 110)
+    journal.append("Test", EVENT_KILL, 11, timestamp=START + 200)
+    journal.append("Test", EVENT_START, 12, REASON_TIMEOUT, timestamp=START + 200)
+    journal.append("Test", EVENT_STOP, 12, timestamp=START + 300)
+    journal.append("Other", EVENT_EXIT, 20, timestamp=START + 400)
+
+    return journal
+
+
+def test_segments_rotate(journal):
+    """
+    Test that the journal starts a new segment when one is full
+    """
+    assert len(journal.segments()) == 2
+    assert len(list(journal.events())) == 8
+
+
+def test_range_skips_segments(journal):
+    """
+    Test that a range query only opens the segments it overlaps
+    """
+    segments = [path for _, path in journal.segments()]
+
+    assert journal.segments_between(START + 250, START + 260) == segments[1:]
+    assert journal.segments_between(START, START + 50) == segments[:1]
+
+
+def test_events_by_name(journal):
+    pids = [record.pid for record in journal.events("Test", START + 100, START + 200)]
+
+    assert pids == [10, 11, 11, 12]
+
+
+def test_last_events(journal):
+    records = journal.last_events("Test", 2)
+
+    assert [record.event for record in records] == [EVENT_START, EVENT_STOP]
+    assert journal.last_events("Other", 10)[0].pid == 20
+    assert journal.last_events("Missing", 10) == []
+
+
+def test_restart_count(journal):
+    assert journal.restart_count("Test") == 2
+    assert journal.restart_count("Test", START + 150) == 1
+    assert journal.restart_count("Other") == 0
+
+
+def test_uptime(journal):
+    """
+    Test that the uptime counts the runs, including one
+    already running when the range starts
+    """
+    assert journal.uptime("Test", START, START + 400) == pytest.approx(72.5)
+    assert journal.uptime("Test", START + 50, START + 100) == pytest.approx(100)
+    assert journal.uptime("Test", START + 300, START + 400) == pytest.approx(0)
+
+
+def test_mtbf(journal):
+    assert journal.mtbf("Test", START, START + 400) == pytest.approx(290)
+    assert journal.mtbf("Test", START + 150, START + 400) is None
+
+
+def test_partial_record_ignored(journal):
+    """
+    Test that a record cut by a crash while writing is not read
+    """
+    _, path = journal.segments()[-1]
+    with open(path, "ab") as f:
+        f.write(b"\x00" * (RECORD.size // 2))
+
+    assert len(list(journal.events())) == 8
+
+
+def test_invalid_event(journal):
+    with pytest.raises(ValueError):
+        journal.append("Test", 100)
+
+
+def test_clock_goes_backwards(tmp_path):
+    """
+    Test that records written after the clock went backwards,
+    also when a segment is full, keep the journal sorted
+    """
+    journal = RunJournal(str(tmp_path), segment_records=2)
+
+    for timestamp in [100, 150, 50, 120, 160]:
+        journal.append("Test", EVENT_START, timestamp=START + timestamp)
+
+    timestamps = [record.timestamp - START for record in journal.events()]
+
+    assert len(timestamps) == 5
+    assert timestamps == sorted(timestamps)
+    assert [record.pid for record in journal.events(since=START + 140)] != []
+    assert all(os.path.getsize(path) <= 2 * RECORD.size for _, path in journal.segments())
+
+
+def test_partial_record_truncated(journal):
+    """
+    Test that a record cut by a crash doesn't misalign the next ones
+    """
+    _, path = journal.segments()[-1]
+    with open(path, "ab") as f:
+        f.write(b"\x00" * (RECORD.size // 2))
+
+    journal.append("Test", EVENT_START, 13, timestamp=START + 500)
+
+    assert journal.last_events("Test", 1)[0].pid == 13
+
+
+def test_rollover_at_real_timestamps(tmp_path):
+    """
+    Test that full segments are never appended to at real epoch
+    values, where a float holds too few digits for microseconds
+    """
+    journal = RunJournal(str(tmp_path), segment_records=1)
+    rng = random.Random(0)
+
+    timestamp = 1_700_000_000 + rng.random()
+    for i in range(100):
+        if rng.random() < 0.5:
+            timestamp += rng.random() * 1e-5
+        journal.append("Test" if i % 2 else "Other", EVENT_START, i + 1, timestamp=timestamp)
+
+    segments = journal.segments()
+    timestamps = [record.timestamp for record in journal.events()]
+
+    assert len(segments) == 100
+    assert all(os.path.getsize(path) == RECORD.size for _, path in segments)
+    assert timestamps == sorted(timestamps)
+    assert all(record.timestamp >= start for (start, _), record in zip(segments, journal.events()))
+
+    last_start, _ = segments[-1]
+    assert journal.last_event("Test", last_start).pid == 98
+    assert journal.last_event("Other", last_start).pid == 99
+
+
+APPENDER_CODE = """
+import sys
+
+from src.journal import RunJournal, EVENT_START
+
+journal = RunJournal(sys.argv[1], segment_records=7)
+for i in range(50):
+    journal.append(sys.argv[2], EVENT_START, i + 1)
+"""
+
+
+def test_concurrent_appends(tmp_path):
+    """
+    Test that several processes appending at once keep
+    every segment within its size and in order
+    """
+    processes = []
+    for i in range(4):
+        processes.append(subprocess.Popen([sys.executable, "-c", APPENDER_CODE, str(tmp_path), f"Script {i}"],
+                                          cwd=REPO_FOLDER))
+    for process in processes:
+        assert process.wait() == 0
+
+    journal = RunJournal(str(tmp_path), segment_records=7)
+    timestamps = [record.timestamp for record in journal.events()]
+
+    assert len(timestamps) == 200
+    assert timestamps == sorted(timestamps)
+
+    for _, path in journal.segments():
+        assert os.path.getsize(path) <= 7 * RECORD.size
+
+
+def test_summary_reads_state(tmp_path, monkeypatch):
+    """
+    Test that a script started many segments ago is seen as running
+    without reading the segments before the range
+    """
+    journal = RunJournal(str(tmp_path), segment_records=2)
+
+    journal.append("Test", EVENT_START, 10, timestamp=START)
+    for i in range(1, 20):
+        journal.append("Other", EVENT_START, 20 + i, timestamp=START + i)
+
+    opened = []
+    segment_enter = journal_module.Segment.__enter__
+
+    def counting_enter(segment):
+        opened.append(segment.path)
+        return segment_enter(segment)
+
+    monkeypatch.setattr(journal_module.Segment, "__enter__", counting_enter)
+
+    assert journal.uptime("Test", START + 18, START + 20) == pytest.approx(100)
+    assert journal.uptime("Missing", START + 18, START + 20) == pytest.approx(0)
+    assert journal.last_events("Missing", 1) == []
+    assert len(set(opened)) <= 2
@@ -0,0 +1,136 @@
+import pytest
+import subprocess
+import sys
+
+from time import sleep, monotonic
+
+from src import zygote
+from src.script import Script
+from src.log_aggregator import LogAggregator, RotatingLog, DROP_POLICY
+
+
+@pytest.fixture
+def aggregator():
+    aggregator = LogAggregator(flush_interval=0.01)
+    yield aggregator
+    aggregator.close()
+
+
+def run_captured(aggregator: LogAggregator,
+                 name: str,
+                 log_path: str,
+                 code: str):
+    process = subprocess.Popen([sys.executable, "-u", "-c", code],
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    aggregator.attach(name, log_path, process.stdout, process.stderr)
+    process.wait()
+
+
+def test_lines_are_labeled(tmp_path, aggregator):
+    """
+    Test that every line gets the stream and the script name
+    """
+    log_path = str(tmp_path / "test.log")
+    code = "import sys; print('out'); print('err', file=sys.stderr)"
+
+    run_captured(aggregator, "Test", log_path, code)
+    aggregator.close()
+
+    with open(log_path) as f:
+        lines = f.read().splitlines()
+
+    assert len(lines) == 2
+    assert any(line.endswith(" [stdout] [Test] out") for line in lines)
+    assert any(line.endswith(" [stderr] [Test] err") for line in lines)
+
+
+def test_runs_share_log(tmp_path):
+    """
+    Test that restarts of a script keep writing the same log
+    and the recent buffer keeps only the last lines
+    """
+    aggregator = LogAggregator(recent_lines=3, flush_interval=0.01)
+    log_path = str(tmp_path / "test.log")
+
+    run_captured(aggregator, "Test", log_path, "print('first')")
+    run_captured(aggregator, "Test", log_path, "print('a'); print('b'); print('c')")
+    aggregator.close()
+
+    with open(log_path) as f:
+        assert len(f.read().splitlines()) == 4
+
+    recent = aggregator.recent("Test")
+    assert [line.split(" ")[-1] for line in recent] == ["a", "b", "c"]
+
+
+def test_drop_policy(tmp_path):
+    """
+    Test that a flooding script loses lines instead of
+    blocking when the drop policy is used
+    """
+    aggregator = LogAggregator(queue_size=10, batch_size=10, flush_interval=0.2, policy=DROP_POLICY)
+    log_path = str(tmp_path / "test.log")
+
+    run_captured(aggregator, "Test", log_path, "for i in range(5000): print(i)")
+    aggregator.close()
+
+    assert aggregator.dropped("Test") > 0
+
+    with open(log_path) as f:
+        content = f.read()
+
+    assert "Dropped" in content
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        LogAggregator(policy="invalid")
+
+
+def test_rotating_log(tmp_path):
+    path = str(tmp_path / "test.log")
+    log = RotatingLog(path, max_bytes=10, backups=2)
+
+    for text in ["aaaaaaaa\n", "bbbbbbbb\n", "cccccccc\n", "dddddddd\n"]:
+        log.write(text)
+    log.close()
+
+    assert (tmp_path / "test.log").read_text() == "dddddddd\n"
+    assert (tmp_path / "test.log.1").read_text() == "cccccccc\n"
+    assert (tmp_path / "test.log.2").read_text() == "bbbbbbbb\n"
+    assert not (tmp_path / "test.log.3").exists()
+
+
+@pytest.mark.parametrize("use_zygote", [False, True])
+def test_script_capture(tmp_path, use_zygote):
+    """
+    Test that a script with capture enabled writes through
+    the aggregator, either started by Popen or by a zygote
+    """
+    if use_zygote and not zygote.is_supported():
+        pytest.skip("Zygote Needs fork")
+
+    (tmp_path / "child.py").write_text("print('captured')")
+
+    aggregator = LogAggregator(flush_interval=0.01)
+    script = Script("Test",
+                    "child.py",
+                    operating_directory=str(tmp_path),
+                    executing_path=sys.executable,
+                    use_zygote=use_zygote,
+                    capture=True)
+    script.aggregator = aggregator
+
+    script.start_script()
+
+    deadline = monotonic() + 10
+    while script.is_running() and monotonic() < deadline:
+        sleep(0.05)
+    aggregator.close()
+
+    if use_zygote:
+        zygote.get_zygote(sys.executable).stop()
+
+    with open(script.capture_path()) as f:
+        assert f.read().endswith(" [stdout] [Test] captured\n")
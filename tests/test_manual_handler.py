@@ -0,0 +1,233 @@
+import pytest
+import json
+import sys
+import threading
+
+from src import manual_handler
+from src.manual_handler import rolling_restart, select_scripts, read_scripts, restart_script
+from src.manual_handler import RESTARTING_EVENT, SETTLED_EVENT, FAILED_EVENT, SKIPPED_EVENT
+from src.exceptions import RollingRestartFailed
+from src.script_handler import ScriptHandler
+from src.utils import is_process_alive
+
+from conftest import create_script
+
+CRASHER = "raise SystemExit(1)\n"
+
+
+@pytest.fixture
+def scripts_file(tmp_path, write_scripts_file):
+    (tmp_path / "crasher.py").write_text(CRASHER)
+
+    scripts = []
+    scripts.append(create_script(tmp_path, "Crash", "crasher.py", group="broken"))
+    scripts.append(create_script(tmp_path, "Web 1", "sleeper.py", group="web", tags=["deploy"]))
+    scripts.append(create_script(tmp_path, "Web 2", "sleeper.py", group="web"))
+    scripts.append(create_script(tmp_path, "Web 3", "sleeper.py", group="web", tags=["deploy"]))
+    scripts.append(create_script(tmp_path, "Probed", "sleeper.py", group="probed",
+                                 probe=f"{sys.executable} -c 'raise SystemExit(1)'"))
+    scripts.append(create_script(tmp_path, "Off", "sleeper.py", group="web", active=False))
+    scripts.append(create_script(tmp_path, "Captured", "sleeper.py", capture=True))
+
+    return write_scripts_file(scripts)
+
+
+class Progress():
+    def __init__(self) -> None:
+        self.events = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, event, name, detail):
+        self.events.append((event, name))
+
+        if event == RESTARTING_EVENT:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        elif event in (SETTLED_EVENT, FAILED_EVENT):
+            self.in_flight -= 1
+
+
+def test_select_scripts(scripts_file):
+    scripts = read_scripts(scripts_file)
+
+    def names(selected):
+        return [script["name"] for script in selected]
+
+    assert names(select_scripts(scripts, tag="deploy")) == ["Web 1", "Web 3"]
+    assert names(select_scripts(scripts, ["Crash"], group="probed")) == ["Crash", "Probed"]
+
+    with pytest.raises(ValueError):
+        select_scripts(scripts)
+
+    with pytest.raises(KeyError):
+        select_scripts(scripts, ["Missing"])
+
+
+def test_rolling_restart_group(scripts_file):
+    """
+    Test that a group is restarted keeping the in flight limit,
+    skipping the deactivated scripts
+    """
+    progress = Progress()
+
+    restarted = rolling_restart(group="web",
+                                max_in_flight=2,
+                                settle=0.3,
+                                scripts_file=scripts_file,
+                                progress=progress,
+                                poll_interval=0.05)
+
+    assert restarted == ["Web 1", "Web 2", "Web 3"]
+    assert progress.max_in_flight == 2
+    assert (SKIPPED_EVENT, "Off") in progress.events
+
+    for script in read_scripts(scripts_file):
+        if script["name"].startswith("Web"):
+            assert is_process_alive(script["pid"])
+        else:
+            assert script.get("pid", None) is None
+
+
+def test_rolling_restart_aborts(scripts_file):
+    """
+    Test that a script dying while settling stops the restart
+    """
+    progress = Progress()
+
+    with pytest.raises(RollingRestartFailed):
+        rolling_restart(["Crash", "Web 1"],
+                        settle=0.5,
+                        scripts_file=scripts_file,
+                        progress=progress,
+                        poll_interval=0.05)
+
+    assert (FAILED_EVENT, "Crash") in progress.events
+    assert (RESTARTING_EVENT, "Web 1") not in progress.events
+
+
+def test_rolling_restart_probe(scripts_file):
+    """
+    Test that a failing probe fails the restart
+    """
+    with pytest.raises(RollingRestartFailed):
+        rolling_restart(group="probed",
+                        settle=0.1,
+                        scripts_file=scripts_file,
+                        progress=Progress(),
+                        poll_interval=0.05)
+
+
+def test_rolling_restart_invalid_script(tmp_path, scripts_file):
+    """
+    Test that a script that can't be loaded is a failure
+    and the one already restarting still settles
+    """
+    scripts = read_scripts(scripts_file)
+    scripts.append(create_script(tmp_path, "Invalid", "sleeper.py", exec_path=3))
+    with open(scripts_file, "w") as f:
+        json.dump(scripts, f)
+
+    progress = Progress()
+
+    with pytest.raises(RollingRestartFailed):
+        rolling_restart(["Web 1", "Invalid"],
+                        max_in_flight=2,
+                        settle=0.2,
+                        scripts_file=scripts_file,
+                        progress=progress,
+                        poll_interval=0.05)
+
+    assert (FAILED_EVENT, "Invalid") in progress.events
+    assert (SETTLED_EVENT, "Web 1") in progress.events
+
+
+def test_rolling_restart_unexpected_error(scripts_file, monkeypatch):
+    """
+    Test that any error restarting a script is a failure
+    """
+    def access_denied(name, scripts_file):
+        raise RuntimeError("Access Denied")
+
+    monkeypatch.setattr(manual_handler, "restart_script", access_denied)
+    progress = Progress()
+
+    with pytest.raises(RollingRestartFailed):
+        rolling_restart(["Web 1"], settle=0, scripts_file=scripts_file, progress=progress)
+
+    assert (FAILED_EVENT, "Web 1") in progress.events
+
+
+def test_rolling_restart_check_error(scripts_file, monkeypatch):
+    """
+    Test that an error checking a settling script is a failure
+    """
+    def access_denied(pid):
+        raise RuntimeError("Access Denied")
+
+    monkeypatch.setattr(manual_handler, "is_process_alive", access_denied)
+    progress = Progress()
+
+    with pytest.raises(RollingRestartFailed):
+        rolling_restart(["Web 1"], settle=0, scripts_file=scripts_file, progress=progress, poll_interval=0.05)
+
+    assert (FAILED_EVENT, "Web 1") in progress.events
+
+
+def test_invalid_in_flight(scripts_file):
+    with pytest.raises(ValueError):
+        rolling_restart(group="web", max_in_flight=0, scripts_file=scripts_file)
+
+
+def find_stored(scripts_file: str,
+                name: str):
+    for script in read_scripts(scripts_file):
+        if script["name"] == name:
+            return script
+
+
+def test_supervisor_restarts_captured(scripts_file):
+    """
+    Test that a captured script is restarted by the watching
+    supervisor instead of the manual handler
+    """
+    handler = ScriptHandler(scripts_file)
+    index = [script.name for script, _ in handler.scripts].index("Captured")
+    old_pid = handler.check_script(index)
+
+    stop = threading.Event()
+
+    def supervise():
+        while not stop.wait(0.05):
+            handler.check_script(index)
+
+    supervisor = threading.Thread(target=supervise)
+    supervisor.start()
+
+    try:
+        new_pid = restart_script("Captured", scripts_file, request_timeout=10, poll_interval=0.05)
+    finally:
+        stop.set()
+        supervisor.join()
+
+    stored = find_stored(scripts_file, "Captured")
+
+    assert new_pid != old_pid
+    assert stored["pid"] == new_pid
+    assert "restart_requested" not in stored
+    assert not is_process_alive(old_pid)
+
+
+def test_captured_restart_fallback(scripts_file, capsys):
+    """
+    Test that a captured script is restarted anyway, with a
+    warning, when no supervisor picks up the request
+    """
+    pid = restart_script("Captured", scripts_file, request_timeout=0.2, poll_interval=0.05)
+
+    stored = find_stored(scripts_file, "Captured")
+
+    assert is_process_alive(pid)
+    assert stored["pid"] == pid
+    assert "restart_requested" not in stored
+    assert "Not Captured" in capsys.readouterr().out
@@ -0,0 +1,166 @@
+import pytest
+import json
+import subprocess
+import sys
+
+from src.script_handler import ScriptHandler
+from src.utils import is_process_alive
+
+from conftest import create_script
+
+
+def read_stored(scripts_file: str):
+    with open(scripts_file) as f:
+        return {script["name"]: script for script in json.load(f)}
+
+
+def write_stored(scripts_file: str,
+                 stored: dict):
+    with open(scripts_file, "w") as f:
+        json.dump(list(stored.values()), f)
+
+
+@pytest.fixture
+def sleeper(sleeper_path):
+    process = subprocess.Popen([sys.executable, str(sleeper_path)])
+    yield process
+    process.kill()
+    process.wait()
+
+
+def test_sync_scripts(scripts_file, sleeper):
+    """
+    Test that pids and active flags changed in the file
+    by other processes are picked up
+    """
+    handler = ScriptHandler(scripts_file)
+
+    stored = read_stored(scripts_file)
+    stored["First"]["pid"] = sleeper.pid
+    stored["First"]["last_date"] = "2025-01-01T00:00:00"
+    stored["Second"]["active"] = False
+    write_stored(scripts_file, stored)
+
+    handler.sync_scripts()
+
+    first, first_active = handler.scripts[0]
+    _, second_active = handler.scripts[1]
+
+    assert first.last_pid == sleeper.pid
+    assert first.last_time.year == 2025
+    assert first_active
+    assert not second_active
+
+
+def test_update_keeps_other_scripts(scripts_file, sleeper):
+    """
+    Test that storing one script doesn't undo changes
+    done to the others meanwhile
+    """
+    handler = ScriptHandler(scripts_file)
+
+    stored = read_stored(scripts_file)
+    stored["Second"]["active"] = False
+    write_stored(scripts_file, stored)
+
+    handler.scripts_dicts[0]["pid"] = sleeper.pid
+    handler.update_scripts_dict(["First"])
+
+    stored = read_stored(scripts_file)
+    assert stored["First"]["pid"] == sleeper.pid
+    assert stored["Second"]["active"] is False
+
+
+def test_check_adopts_manual_restart(scripts_file, sleeper):
+    """
+    Test that a process started by someone else after the last
+    sync is adopted instead of starting a second one
+    """
+    handler = ScriptHandler(scripts_file)
+
+    stored = read_stored(scripts_file)
+    stored["First"]["pid"] = sleeper.pid
+    stored["Second"]["active"] = False
+    write_stored(scripts_file, stored)
+
+    assert handler.check_script(0) is None
+    assert handler.check_script(1) is None
+
+    first, _ = handler.scripts[0]
+    assert first.last_pid == sleeper.pid
+    assert read_stored(scripts_file)["Second"].get("pid", None) is None
+
+
+def test_check_starts_dead_script(scripts_file):
+    """
+    Test that a script that is not running is started and stored
+    """
+    handler = ScriptHandler(scripts_file)
+
+    new_pid = handler.check_script(0)
+
+    assert new_pid is not None
+    assert is_process_alive(new_pid)
+    assert read_stored(scripts_file)["First"]["pid"] == new_pid
+
+
+def test_check_restarts_requested(scripts_file):
+    """
+    Test that a restart requested in the scripts file is done
+    and the request cleared
+    """
+    handler = ScriptHandler(scripts_file)
+    old_pid = handler.check_script(0)
+
+    stored = read_stored(scripts_file)
+    stored["First"]["restart_requested"] = True
+    write_stored(scripts_file, stored)
+
+    new_pid = handler.check_script(0)
+
+    assert new_pid is not None and new_pid != old_pid
+    assert "restart_requested" not in read_stored(scripts_file)["First"]
+    assert handler.check_script(0) is None
+
+
+def test_sync_follows_file_changes(tmp_path, scripts_file, sleeper):
+    """
+    Test that scripts added, removed or edited in the file
+    are followed, keeping the state of the unchanged ones
+    """
+    handler = ScriptHandler(scripts_file)
+
+    stored = read_stored(scripts_file)
+    stored["First"]["pid"] = sleeper.pid
+    stored["First"]["arguments"] = ["edited"]
+    del stored["Second"]
+    stored["Third"] = create_script(tmp_path, "Third")
+    stored["Broken"] = create_script(tmp_path, "Broken")
+    stored["Broken"]["directory"] = str(tmp_path / "missing")
+    write_stored(scripts_file, stored)
+
+    handler.sync_scripts()
+
+    assert [script.name for script, _ in handler.scripts] == ["First", "Third"]
+    assert [data["name"] for data in handler.scripts_dicts] == ["First", "Third"]
+
+    first, _ = handler.scripts[0]
+    assert first.arguments == ["edited"]
+    assert first.last_pid == sleeper.pid
+
+    handler.sync_scripts()
+    assert handler.scripts[0][0] is first
+
+
+def test_watch_quiet_when_idle(scripts_file, capsys):
+    """
+    Test that checks in watch mode only print when something happened
+    """
+    handler = ScriptHandler(scripts_file)
+    handler.check_script(0)
+    handler.check_script(1)
+    capsys.readouterr()
+
+    handler.check_scripts(report_idle=False)
+
+    assert capsys.readouterr().out == ""
@@ -1,8 +1,13 @@
 import pytest
 import os
+import sys
 
 from src.script import Script
 from src.exceptions import ProcessException, InvalidDirectory
+from src.journal import RunJournal, NO_STATUS
+from src.journal import EVENT_START, EVENT_EXIT, EVENT_KILL, EVENT_STOP
+from src.journal import REASON_FIRST, REASON_EXITED, REASON_TIMEOUT, REASON_MANUAL
+from src.utils import is_process_alive, kill_process
 
 THIS_FOLDER = os.path.dirname(__file__)
 
@@ -83,3 +88,69 @@ def test_invalid_exec_path():
                         None,
                         3)
 
+
+@pytest.fixture
+def journaled_script(tmp_path, sleeper_path):
+    script = Script("Test",
+                    "sleeper.py",
+                    operating_directory=str(tmp_path),
+                    executing_path=sys.executable,
+                    save_path=str(tmp_path / "test.txt"))
+    script.journal = RunJournal(str(tmp_path / "journal"))
+
+    yield script
+
+    if script.is_running():
+        kill_process(script.last_pid)
+    script.process.wait()
+
+
+def journal_events(script: Script):
+    return [(record.event, record.reason) for record in script.journal.events()]
+
+
+def test_check_alive_journal(journaled_script):
+    """
+    Test that starts, exits and timeout kills found
+    when checking the script are recorded
+    """
+    first_pid = journaled_script.check_script_alive()
+    assert journaled_script.check_script_alive() is None
+
+    kill_process(first_pid)
+    journaled_script.process.wait()
+    journaled_script.check_script_alive()
+
+    journaled_script.timeout = 1
+    journaled_script.last_time = journaled_script.last_time.replace(year=2000)
+    journaled_script.check_script_alive()
+
+    assert journal_events(journaled_script) == [(EVENT_START, REASON_FIRST),
+                                                (EVENT_EXIT, REASON_FIRST),
+                                                (EVENT_START, REASON_EXITED),
+                                                (EVENT_KILL, REASON_FIRST),
+                                                (EVENT_START, REASON_TIMEOUT)]
+
+    exit_record = list(journaled_script.journal.events())[1]
+    assert exit_record.pid == first_pid
+    assert exit_record.exit_status != NO_STATUS
+
+
+def test_restart_and_stop_journal(journaled_script):
+    """
+    Test that manual restarts and stops are recorded
+    """
+    journaled_script.check_script_alive()
+    journaled_script.restart_process()
+
+    journaled_script.stop_process(EVENT_STOP)
+    journaled_script.process.wait()
+    assert not is_process_alive(journaled_script.last_pid)
+
+    journaled_script.stop_process()
+
+    assert journal_events(journaled_script) == [(EVENT_START, REASON_FIRST),
+                                                (EVENT_KILL, REASON_FIRST),
+                                                (EVENT_START, REASON_MANUAL),
+                                                (EVENT_STOP, REASON_FIRST),
+                                                (EVENT_EXIT, REASON_FIRST)]
@@ -0,0 +1,228 @@
+import pytest
+import json
+import os
+import signal
+import subprocess
+import sys
+
+from time import sleep, monotonic, time
+
+from src import sharding
+from src.sharding import ShardCoordinator
+from src.exceptions import ShardException
+
+pytestmark = pytest.mark.skipif(sharding.fcntl is None, reason="Sharding Needs fcntl")
+
+THIS_FOLDER = os.path.dirname(__file__)
+REPO_FOLDER = os.path.join(THIS_FOLDER, os.pardir)
+
+NAMES = [f"Script {i}" for i in range(40)]
+
+SUPERVISOR_CODE = """
+import json
+import os
+import sys
+from time import sleep
+
+from src.sharding import ShardCoordinator
+
+folder, supervisor_id, lease_period = sys.argv[1], sys.argv[2], float(sys.argv[3])
+names = json.loads(sys.argv[4])
+
+coordinator = ShardCoordinator(folder, supervisor_id, lease_period)
+coordinator.join()
+
+while True:
+    coordinator.refresh()
+    owned = [name for name in names if coordinator.owns(name)]
+    with open(f"{folder}/{supervisor_id}.json.tmp", "w") as f:
+        json.dump(owned, f)
+    os.replace(f"{folder}/{supervisor_id}.json.tmp", f"{folder}/{supervisor_id}.json")
+    sleep(coordinator.refresh_interval)
+"""
+
+
+def owned_by(coordinators):
+    owned = {}
+    for coordinator in coordinators:
+        coordinator.refresh()
+        owned[coordinator.supervisor_id] = {name for name in NAMES if coordinator.owns(name)}
+    return owned
+
+
+def test_scripts_are_split(tmp_path):
+    """
+    Test that every script is owned by exactly one supervisor
+    """
+    coordinators = [ShardCoordinator(str(tmp_path), f"supervisor-{i}") for i in range(3)]
+    for coordinator in coordinators:
+        coordinator.join()
+
+    owned = owned_by(coordinators)
+
+    assert all(len(names) > 0 for names in owned.values())
+    assert sum(len(names) for names in owned.values()) == len(NAMES)
+    assert set.union(*owned.values()) == set(NAMES)
+
+
+def test_dead_supervisor_scripts_move(tmp_path):
+    """
+    Test that when a supervisor dies only its scripts move,
+    and they are split between the survivors
+    """
+    coordinators = [ShardCoordinator(str(tmp_path), f"supervisor-{i}") for i in range(3)]
+    for coordinator in coordinators:
+        coordinator.join()
+
+    before = owned_by(coordinators)
+
+    # Dying keeps the lease file but releases its lock
+    coordinators[0].lease_file.close()
+
+    after = owned_by(coordinators[1:])
+
+    assert set.union(*after.values()) == set(NAMES)
+    for supervisor_id, names in after.items():
+        assert before[supervisor_id] <= names
+
+
+def test_stalled_lease_kept(tmp_path):
+    """
+    Test that a lease not renewed for long is still alive
+    while its lock is held, whatever the clocks say
+    """
+    stalled = ShardCoordinator(str(tmp_path), "stalled", lease_period=3)
+    stalled.join()
+    coordinator = ShardCoordinator(str(tmp_path), "alive", lease_period=3)
+    coordinator.join()
+
+    old_time = time() - 3600
+    os.utime(stalled.lease_path, (old_time, old_time))
+
+    assert coordinator.refresh() == ["alive", "stalled"]
+
+
+def test_removed_lease_renewed(tmp_path):
+    """
+    Test that a supervisor whose lease was removed takes a new one
+    """
+    coordinator = ShardCoordinator(str(tmp_path), "supervisor")
+    coordinator.join()
+
+    os.remove(coordinator.lease_path)
+    coordinator.refresh()
+
+    assert os.path.exists(coordinator.lease_path)
+    assert ShardCoordinator(str(tmp_path), "other").is_alive(coordinator.lease_path)
+
+
+def test_other_host_refused(tmp_path):
+    """
+    Test that a live supervisor on another host is refused,
+    as the stored pids only make sense on one host
+    """
+    remote = ShardCoordinator(str(tmp_path), "remote")
+    remote.join()
+
+    with open(remote.lease_path, "w") as f:
+        json.dump({"id": "remote", "host": "another-host", "pid": 1}, f)
+
+    coordinator = ShardCoordinator(str(tmp_path), "local")
+
+    with pytest.raises(ShardException):
+        coordinator.join()
+
+
+def test_other_host_skipped(tmp_path, capsys):
+    """
+    Test that a supervisor of another host showing up later is
+    left out of the ring instead of stopping the running ones
+    """
+    coordinator = ShardCoordinator(str(tmp_path), "local")
+    coordinator.join()
+
+    remote = ShardCoordinator(str(tmp_path), "remote")
+    remote.join()
+
+    with open(remote.lease_path, "w") as f:
+        json.dump({"id": "remote", "host": "another-host", "pid": 1}, f)
+
+    assert coordinator.refresh() == ["local"]
+    assert all(coordinator.owns(name) for name in NAMES)
+    assert "another-host" in capsys.readouterr().out
+
+
+def test_duplicated_id(tmp_path):
+    coordinator = ShardCoordinator(str(tmp_path), "supervisor")
+    coordinator.join()
+
+    with pytest.raises(ShardException):
+        ShardCoordinator(str(tmp_path), "supervisor").join()
+
+
+def test_leave(tmp_path):
+    coordinator = ShardCoordinator(str(tmp_path), "leaving")
+    coordinator.join()
+    other = ShardCoordinator(str(tmp_path), "staying")
+    other.join()
+
+    coordinator.leave()
+
+    assert other.refresh() == ["staying"]
+    assert all(other.owns(name) for name in NAMES)
+
+
+def read_owned(folder: str,
+               supervisor_ids: list):
+    owned = {}
+    for supervisor_id in supervisor_ids:
+        try:
+            with open(os.path.join(folder, f"{supervisor_id}.json")) as f:
+                owned[supervisor_id] = set(json.load(f))
+        except FileNotFoundError:
+            owned[supervisor_id] = set()
+    return owned
+
+
+def wait_for_split(folder: str,
+                   supervisor_ids: list,
+                   timeout: float):
+    deadline = monotonic() + timeout
+    while monotonic() < deadline:
+        owned = read_owned(folder, supervisor_ids)
+        split = sum(len(names) for names in owned.values()) == len(NAMES)
+        split = split and all(len(names) > 0 for names in owned.values())
+        if split and set.union(*owned.values()) == set(NAMES):
+            return owned
+        sleep(0.05)
+
+    raise AssertionError(f"Scripts Not Split In Time {read_owned(folder, supervisor_ids)}")
+
+
+def test_supervisor_processes(tmp_path):
+    """
+    Test several supervisor processes against the same folder,
+    killing one of them
+    """
+    lease_period = 1.5
+    supervisor_ids = [f"supervisor-{i}" for i in range(3)]
+    processes = []
+
+    for supervisor_id in supervisor_ids:
+        process = subprocess.Popen([sys.executable, "-c", SUPERVISOR_CODE,
+                                    str(tmp_path), supervisor_id, str(lease_period), json.dumps(NAMES)],
+                                   cwd=REPO_FOLDER)
+        processes.append(process)
+
+    try:
+        wait_for_split(str(tmp_path), supervisor_ids, 10)
+
+        processes[0].send_signal(signal.SIGKILL)
+        processes[0].wait()
+
+        owned = wait_for_split(str(tmp_path), supervisor_ids[1:], lease_period)
+        assert set.union(*owned.values()) == set(NAMES)
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
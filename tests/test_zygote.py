@@ -0,0 +1,191 @@
+import pytest
+import os
+import sys
+import threading
+
+from time import sleep, monotonic
+
+from src import zygote
+from src.utils import is_process_alive
+
+pytestmark = pytest.mark.skipif(not zygote.is_supported(), reason="Zygote Needs fork")
+
+CHILD_SCRIPT = """
+import os
+import sys
+
+print(sys.argv[1:])
+print(os.getcwd())
+print(os.getsid(0) == os.getpid())
+print("json" in sys.modules)
+"""
+
+
+def wait_for_exit(pid: int):
+    deadline = monotonic() + 10
+    while is_process_alive(pid) and monotonic() < deadline:
+        sleep(0.05)
+
+
+@pytest.fixture
+def script_zygote(tmp_path):
+    runtime_folder = tmp_path / "runtime"
+    script_zygote = zygote.Zygote(sys.executable, ["json"], str(runtime_folder))
+    yield script_zygote
+    script_zygote.stop()
+
+
+def test_launch_runs_file(tmp_path, script_zygote):
+    """
+    Test that a launched script gets its arguments, directory,
+    session and the preloaded modules
+    """
+    (tmp_path / "child.py").write_text(CHILD_SCRIPT)
+    log_path = tmp_path / "child.txt"
+
+    pid = script_zygote.launch("child.py", str(tmp_path), ["1", "two"], str(log_path))
+
+    wait_for_exit(pid)
+
+    lines = log_path.read_text().splitlines()
+    assert lines == ["['1', 'two']", str(tmp_path), "True", "True"]
+
+
+def test_launch_reuses_zygote(tmp_path, script_zygote):
+    """
+    Test that several launches are served by the same zygote
+    """
+    (tmp_path / "child.py").write_text("print('ok')")
+
+    first_pid = script_zygote.launch("child.py", str(tmp_path), [], str(tmp_path / "a.txt"))
+    assert script_zygote.is_running()
+    second_pid = script_zygote.launch("child.py", str(tmp_path), [], str(tmp_path / "b.txt"))
+
+    wait_for_exit(first_pid)
+    wait_for_exit(second_pid)
+
+    assert first_pid != second_pid
+    assert (tmp_path / "a.txt").read_text() == "ok\n"
+    assert (tmp_path / "b.txt").read_text() == "ok\n"
+
+
+def test_launch_reports_exceptions(tmp_path, script_zygote):
+    """
+    Test that an exception in the script ends in its log
+    """
+    (tmp_path / "child.py").write_text("raise ValueError('Broken')")
+    log_path = tmp_path / "child.txt"
+
+    pid = script_zygote.launch("child.py", str(tmp_path), [], str(log_path))
+
+    wait_for_exit(pid)
+
+    assert "ValueError: Broken" in log_path.read_text()
+
+
+SHUTDOWN_SCRIPT = """
+import atexit
+import threading
+import time
+
+def work():
+    time.sleep(0.2)
+    print("thread done", flush=True)
+
+atexit.register(print, "atexit ran")
+threading.Thread(target=work).start()
+print("main done", flush=True)
+"""
+
+
+def test_launch_shuts_down_normally(tmp_path, script_zygote):
+    """
+    Test that a launched script waits for its threads
+    and runs its atexit handlers, as a normal run does
+    """
+    (tmp_path / "child.py").write_text(SHUTDOWN_SCRIPT)
+    log_path = tmp_path / "child.txt"
+
+    pid = script_zygote.launch("child.py", str(tmp_path), [], str(log_path))
+
+    wait_for_exit(pid)
+
+    assert log_path.read_text().splitlines() == ["main done", "thread done", "atexit ran"]
+
+
+def test_launch_keeps_log_clean(tmp_path, script_zygote):
+    """
+    Test that the running checks don't fill the zygote log
+    """
+    (tmp_path / "child.py").write_text("print('ok')")
+
+    for i in range(3):
+        wait_for_exit(script_zygote.launch("child.py", str(tmp_path), [], str(tmp_path / f"{i}.txt")))
+        assert script_zygote.is_running()
+
+    with open(script_zygote.log_path) as f:
+        assert "Traceback" not in f.read()
+
+
+def test_stale_preload_replaced(tmp_path, monkeypatch):
+    """
+    Test that a zygote whose preloaded module changed on
+    disk is replaced before the next launch
+    """
+    module_path = tmp_path / "preloaded.py"
+    module_path.write_text("VALUE = 1\n")
+    (tmp_path / "child.py").write_text("import preloaded\nprint(preloaded.VALUE)\n")
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path))
+
+    script_zygote = zygote.Zygote(sys.executable, ["preloaded"], str(tmp_path / "runtime"))
+
+    try:
+        wait_for_exit(script_zygote.launch("child.py", str(tmp_path), [], str(tmp_path / "a.txt")))
+
+        module_path.write_text("VALUE = 2\n")
+        os.utime(module_path, ns=(0, 0))
+
+        wait_for_exit(script_zygote.launch("child.py", str(tmp_path), [], str(tmp_path / "b.txt")))
+    finally:
+        script_zygote.stop()
+
+    assert (tmp_path / "a.txt").read_text() == "1\n"
+    assert (tmp_path / "b.txt").read_text() == "2\n"
+
+
+def test_launch_needs_output(tmp_path, script_zygote):
+    with pytest.raises(ValueError):
+        script_zygote.launch("child.py", str(tmp_path), [])
+
+
+def test_shared_runtime_folder(tmp_path):
+    """
+    Test that a runtime folder others can reach is refused
+    """
+    runtime_folder = tmp_path / "shared"
+    runtime_folder.mkdir()
+    os.chmod(runtime_folder, 0o777)
+
+    with pytest.raises(zygote.ZygoteException):
+        zygote.Zygote(sys.executable, [], str(runtime_folder))
+
+
+def test_concurrent_start(tmp_path):
+    """
+    Test that two supervisors needing the same zygote
+    at once only start one server
+    """
+    runtime_folder = str(tmp_path / "runtime")
+    zygotes = [zygote.Zygote(sys.executable, [], runtime_folder) for _ in range(2)]
+    threads = [threading.Thread(target=script_zygote.ensure_running) for script_zygote in zygotes]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        with open(zygotes[0].log_path) as f:
+            assert f.read().count("Zygote Ready") == 1
+    finally:
+        zygotes[0].stop()